@@ -1,26 +1,67 @@
 from __future__ import annotations
 
 import asyncio
-import re
+import hashlib
 import time
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import AsyncGenerator, List, Optional
+from urllib.parse import urlsplit
+from typing import AsyncGenerator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 
-import uvloop
-import xmltodict
-from pydantic import BaseModel, Field, validator
-from selectolax.parser import HTMLParser as SHTMLParser
+import aiofiles
+from pydantic import BaseModel, Field, PrivateAttr, validator
 
-from utils import download_remote_file, split_rpm_filename
-
-amazon_security_advisories = {
-    # '1': 'https://alas.aws.amazon.com/alas.rss',
-    "2": "https://alas.aws.amazon.com/AL2/alas.rss"
-}
+import nevra
+from blobstore import BlobStore
+from cache import HttpCache
+from client import PooledClient
+from feed import parse_items, stream_items
+from filters import FilterSpec
+from fixes import ParseExecutor
+from instrumentation import Instrumentation
+from models import PFixedIn, PVulnerability
+from monitor import LoopMonitor
+from normalize import UNKNOWN_SEVERITY, intern, normalize_cves, normalize_severity
+from parsers import ParserBase
+from pipeline import Pipeline, Stage
+from retry import CircuitBreaker, RetryPolicy
+from scheduler import Scheduler
+from sinks import Sink
+from sync_state import SyncState, item_digest
+from utils import download_remote_file, stream_remote_file
 
 driver_workspace = Path("/tmp/amazon3")
 
 
+sev_strip_table = str.maketrans("", "", "!@#$():")
+
+
+@lru_cache(maxsize=4096)
+def split_title(title: str) -> Tuple[str, Optional[str]]:
+    """
+    'ALAS2-2021-1234 (important): openssl' -> ('ALAS2-2021-1234', 'important')
+    memoized, so the id and sev validators of an item share a single split of its title
+    """
+    words = title.split(" ", 2)
+    return words[0], words[1].translate(sev_strip_table) if len(words) > 1 else None
+
+
+def item_id(item) -> str:
+    """ALAS id of an rss item, the first word of its title"""
+    return split_title(item["title"])[0]
+
+
+def item_host(item) -> str:
+    """host of the advisory page an rss item (or a lazily listed Summary) links to, used to cap concurrent fetches"""
+    link = item.url if isinstance(item, Summary) else item["link"]
+    return urlsplit(link.strip()).netloc
+
+
+def feed_digest(content: bytes) -> str:
+    """hash of a whole feed, recorded once its items were all validated"""
+    return hashlib.sha1(content).hexdigest()
+
+
 # Pydantic Models
 class AlasFixedIn(BaseModel):
     pkg: str = Field(..., alias="name")
@@ -36,10 +77,7 @@ class AlasFixedIn(BaseModel):
     @validator("ver", pre=True)
     def transform_release(cls, v):
         if v:
-            name, version, release, epoch, arch = split_rpm_filename(v)
-            if release:
-                return f"{version}-{release}"
-            return version
+            return nevra.split(v).version_release
         return None
 
 
@@ -49,6 +87,9 @@ class Summary(BaseModel):
     cves: Optional[List[str]] = Field(..., alias="description")
     url: str = Field(..., alias="link")
     fixes: Optional[List[AlasFixedIn]] = None
+    # set on the summaries a lazy driver lists, see load_fixes
+    _loader: Optional[Callable[["Summary"], Awaitable]] = PrivateAttr(default=None)
+    _loading: Optional[asyncio.Future] = PrivateAttr(default=None)
 
     @validator("cves", pre=True)
     def cves_from_description(cls, v):
@@ -59,113 +100,573 @@ class Summary(BaseModel):
     @validator("id", pre=True)
     def id_from_title(cls, v):
         if v:
-            return v.split(" ")[0]
+            return split_title(v)[0]
         return None
 
     @validator("sev", pre=True)
     def sev_from_title(cls, v):
         if v:
-            return v.split(" ")[1].translate(str.maketrans("", "", "!@#$():"))
+            return split_title(v)[1]
         return None
 
+    async def load_fixes(self) -> Optional[List[AlasFixedIn]]:
+        """
+        fixes of a summary listed by a lazy driver, downloaded on the first call and kept after that; concurrent
+        callers share the download, cancelling one of them does not cancel it for the others, and a failed download
+        is tried again on the next call
+        """
+        if self.fixes is None and self._loader is not None:
+            if self._loading is None:
+                self._loading = asyncio.ensure_future(self._loader(self))
+                # registered before any caller waits on it, so it is cleared before they resume
+                self._loading.add_done_callback(self._loaded)
+            await asyncio.shield(self._loading)
+        return self.fixes
+
+    def _loaded(self, loading: asyncio.Future):
+        self._loading = None
+        if not loading.cancelled():
+            # retrieved here in case every caller was cancelled, the next load_fixes tries again
+            loading.exception()
+
     @classmethod
     async def async_parse(cls, data):
         return cls.parse_obj(data)
 
+    @classmethod
+    def from_item(cls, item: dict, trusted: bool = False) -> Summary:
+        """
+        the summary of an rss item
+        :param trusted: skip validation (pydantic construct) for input that was validated before, e.g. a feed the
+        driver validated completely before, see AmazonFeedDriver.is_validated
+        """
+        if not trusted:
+            return cls.parse_obj(item)
+        title = item.get("title")
+        alas_id, sev = split_title(title) if title else (None, None)
+        description = item.get("description")
+        return cls.construct(
+            id=alas_id,
+            sev=sev,
+            cves=description.split(", ") if description else [],
+            url=item["link"],
+        )
+
+    @classmethod
+    def parse_many(cls, items: Iterable[dict], trusted: bool = False) -> List[Summary]:
+        """build the summaries of a whole feed in one call, see from_item"""
+        return [cls.from_item(item, trusted) for item in items]
+
+
+@lru_cache(maxsize=None)
+def release_namespace(version: str) -> str:
+    """
+    namespace of the records of a feed, from the release it was extracted for and not from the ALAS ids, which
+    carry extras prefixes (ALAS2KERNEL-5.10-..., ALAS2LIVEPATCH-...); memoized, so they all share one string
+    """
+    return f"amzn:{version}"
+
+
+# every field is set on the fixes the driver builds, so they all share one fields set instead of a set each
+alas_fixed_in_fields = set(AlasFixedIn.__fields__)
+pfixed_in_fields = set(PFixedIn.__fields__)
+
+
+def normalize_summary(summary: Summary) -> Summary:
+    """
+    normalization stage: severity through normalize.severity_map, CVE ids validated and interned, fixed versions
+    interned (the same version is listed for every arch of a package) and the validated fixes rebuilt compact
+    """
+    summary.sev = normalize_severity(summary.sev)
+    summary.cves = normalize_cves(summary.cves or [])
+    if summary.fixes:
+        summary.fixes = normalize_fixes(summary.fixes)
+    return summary
+
+
+def normalize_fixes(fixes: List[AlasFixedIn]) -> List[AlasFixedIn]:
+    return [AlasFixedIn.construct(alas_fixed_in_fields, pkg=fix.pkg, ver=intern(fix.ver)) for fix in fixes]
+
+
+def map_to_vulnerability(summary: Summary, version: str) -> PVulnerability:
+    namespace = release_namespace(version)
+    return PVulnerability(
+        Name=summary.id,
+        NamespaceName=namespace,
+        Description="",
+        Severity=summary.sev or UNKNOWN_SEVERITY,
+        Metadata={"CVE": summary.cves or []},
+        Link=summary.url,
+        # built from validated summaries, so the fixes skip validation
+        FixedIn=[
+            PFixedIn.construct(
+                pfixed_in_fields,
+                Name=intern(nevra.split(fix.pkg).name),
+                NamespaceName=namespace,
+                VersionFormat="rpm",
+                Version=fix.ver,
+            )
+            for fix in summary.fixes or []
+        ],
+    )
+
+
+class DeletedSummary(BaseModel):
+    """advisory recorded by a previous sync that is no longer in the feed"""
+
+    id: str
+    deleted: bool = True
+
 
 # New Feed Driver
 class AmazonFeedDriver:
-    def __init__(self, workspace: Path):
+    def __init__(
+        self,
+        workspace: Path,
+        client: Optional[PooledClient] = None,
+        scheduler: Optional[Scheduler] = None,
+        cache: Optional[HttpCache] = None,
+        state: Optional[SyncState] = None,
+        report_deletions: bool = False,
+        parse_executor: Optional[ParseExecutor] = None,
+        parse_workers: int = 16,
+        build_workers: int = 1,
+        sink: Optional[Sink] = None,
+        store: Optional[BlobStore] = None,
+        offline: bool = False,
+        instrumentation: Optional[Instrumentation] = None,
+        monitor: Optional[LoopMonitor] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        retry_rounds: int = 1,
+        normalize: bool = True,
+        lazy: bool = False,
+        **client_options,
+    ):
+        """
+        :param workspace: directory the downloaded feed and advisory pages are written to
+        :param client: a shared PooledClient, the caller stays responsible for closing it
+        :param scheduler: Scheduler of the fetch stage, bounds how many advisory pages are downloaded at once
+        :param cache: HttpCache used to revalidate or reuse the pages stored in the workspace by previous runs
+        :param state: SyncState of the previous run, only new or changed advisories are processed when given
+        :param report_deletions: with a state, also yield a DeletedSummary for advisories removed from the feed
+        :param parse_executor: where advisory pages are parsed (inline, thread or process pool), inline by default
+        :param parse_workers: concurrent pages handed to the parse_executor
+        :param build_workers: workers of the model build stage
+        :param sink: Sink every summary is written to, as a PVulnerability, before items() yields it
+        :param store: BlobStore recording every downloaded feed and page, deduplicated and compressed
+        :param offline: replay a previous run from the store, without any network access
+        :param instrumentation: Instrumentation the download, parse and validate spans are recorded to, a new one
+        when none is given
+        :param monitor: LoopMonitor started with the first extract, reports loop lag and the calls that blocked the loop
+        :param retry_policy: RetryPolicy of the downloads, by default with a CircuitBreaker throttling the scheduler
+        :param retry_rounds: passes over the advisories whose download still failed, after the rest of the feed
+        :param normalize: run the normalization stage (normalize_summary) on every summary
+        :param lazy: only read the feed, items() yields summaries without fixes, loaded later by
+        Summary.load_fixes or in bulk by hydrate; the sync state is not used in this mode
+        :param client_options: pool settings (max_connections, max_connections_per_host, http2, keepalive_expiry...)
+        used to build the driver's own client when none is given
+        """
         self.workspace = workspace
+        self._owns_client = client is None
+        self.client = client if client is not None else PooledClient(**client_options)
+        self.scheduler = (
+            scheduler
+            if scheduler is not None
+            else Scheduler(workers=20, max_per_host=20, key=item_host)
+        )
+        self.cache = cache
+        self.state = state
+        self.report_deletions = report_deletions
+        self._owns_parse_executor = parse_executor is None
+        self.parse_executor = parse_executor if parse_executor is not None else ParseExecutor()
+        self.parse_workers = parse_workers
+        self.build_workers = build_workers
+        self.sink = sink
+        if offline and store is None:
+            raise ValueError("Offline mode requires a BlobStore to replay from")
+        self.store = store
+        self.offline = offline
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self.monitor = monitor
+        self.retry_policy = (
+            retry_policy
+            if retry_policy is not None
+            else RetryPolicy(breaker=CircuitBreaker(scheduler=self.scheduler))
+        )
+        self.retry_rounds = retry_rounds
+        self.retry_queue: List[dict] = []
+        self.failed: List[dict] = []
+        self.normalize = normalize
+        self.lazy = lazy
+        # release -> pipeline of its last extract, a driver may extract several feeds
+        self.pipelines: Dict[str, Pipeline] = {}
 
-    async def items(self):
+    async def close(self):
+        if self.monitor is not None:
+            await self.monitor.stop()
+        if self._owns_parse_executor:
+            self.parse_executor.shutdown()
+        if self._owns_client and not self.client.is_closed:
+            await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def items(self, filters: Optional[FilterSpec] = None):
+        """
+        :param filters: FilterSpec of the advisories to extract, its rss item predicates are checked before any
+        advisory page is scheduled for download, its package globs right after the fixes were extracted
+        """
         for version, url in amazon_security_advisories.items():
             # for each list of summaries returned by the url
-            async for summary in self.extract(url, version):
+            async for summary in self.extract(url, version, filters):
                 # for each list of summaries returned by the url
                 yield summary
 
-    @staticmethod
-    async def find_packages(pattern, text):
-        return re.search(pattern, text)
-
-    async def get_fixes_for_html(self, alas_html):
-        """This method takes up to 24 secs for execution"""
-        arch_patterns = [r"src\b.+\.src", r"noarch\b.+\.noarch", r"x86_64\b.+\.x86_64"]
-        fixes = []
-        # parse alas html for fixes
-        tree = SHTMLParser(alas_html)
-        if data := tree.body.select("#new_packages").matches[0]:
-            np_div = data.text().replace("\xa0", " ").strip()
-            for fut in asyncio.as_completed(
-                [
-                    self.find_packages(arch_pattern, np_div)
-                    for arch_pattern in arch_patterns
-                ]
-            ):
-                found = await fut
-                if found:
-                    # add package_name.arch to fixes
-                    fixes.append(
-                        AlasFixedIn.parse_obj(
-                            {"name": found.group(0).split(":")[1].strip()}
-                        )
-                    )
-        return fixes
-
-    async def process_summary(self, item):
-        summary_start_time = time.time()
-        summary = await Summary.async_parse(item)
-        summary_time = time.time() - summary_start_time
-        # download the summary
-        html_start_time = time.time()
-        summary_html = await download_remote_file(
-            summary.url, self.workspace / "html" / summary.id
-        )
-        html_time = time.time() - html_start_time
-        # get fixes for summary
-        fixes_start_time = time.time()
-        fixes = await self.get_fixes_for_html(summary_html)
-        summary.fixes = fixes
-        fixes_time = time.time() - fixes_start_time
-        print(
-            f"processing summary: {summary.id} - summary: {summary_time}, html: {html_time}, fixes: {fixes_time}"
-        )
+    async def fetch_advisory(self, item) -> Tuple[dict, str]:
+        """fetch stage: download the advisory page an rss item links to"""
+        html = await self.download(item["link"].strip(), self.workspace / "html" / item_id(item))
+        return item, html
+
+    async def parse_advisory(self, fetched: Tuple[dict, str]) -> Tuple[dict, Tuple[str, ...]]:
+        """parse stage: this takes up to 24 secs for execution, the parsing runs on the driver's ParseExecutor"""
+        item, html = fetched
+        with self.instrumentation.span("parse"):
+            return item, await self.parse_executor.parse(html)
+
+    def build_summary(self, parsed: Tuple[dict, Tuple[str, ...]], trusted: bool = False) -> Summary:
+        """model build stage: validate the rss item (unless trusted) and its fixes into a Summary"""
+        item, names = parsed
+        with self.instrumentation.span("validate"):
+            summary = Summary.from_item(item, trusted)
+            summary.fixes = [AlasFixedIn.parse_obj({"name": name}) for name in names]
+        return summary
+
+    async def emit(self, summary: Summary, version: str) -> Summary:
+        """sink stage: write the summary of the release's feed to the driver's sink before it is yielded"""
+        await self.sink.write(map_to_vulnerability(summary, version))
         return summary
 
-    async def extract(self, url: str, version: int) -> AsyncGenerator:
-        dl_start_time = time.time()
-        content = await download_remote_file(url, self.workspace / f"{version}_rss.xml")
-        download_time = time.time() - dl_start_time
-        parse_start_time = time.time()
-        rss_dict = xmltodict.parse(content)
-        parse_time = time.time() - parse_start_time
-        print(f"download time: {download_time}")
-        print(f"parse time: {parse_time}")
-        for fut in asyncio.as_completed(
-            [self.process_summary(item) for item in rss_dict["rss"]["channel"]["item"]]
-        ):
+    def build_pipeline(
+        self,
+        version: str,
+        filters: Optional[FilterSpec] = None,
+        trusted: bool = False,
+        pending: Optional[dict] = None,
+    ) -> Pipeline:
+        """
+        :param trusted: the items of the feed were validated by a previous extract, see is_validated
+        :param pending: ALAS id -> (item hash, pubDate) filled by changed_items, with a sync state
+        """
+
+        def match_packages(parsed):
+            if filters.match_fixes(parsed[1]):
+                return parsed
+            # recorded like a built one, so the next sync does not fetch it again until it changes
+            if self.state is not None:
+                alas_id = item_id(parsed[0])
+                self.state.update(alas_id, *pending[alas_id], version)
+            return None
+
+        stages = [
+            Stage("fetch", self.fetch_advisory, scheduler=self.scheduler, on_error=self.queue_retry),
+            Stage("parse", self.parse_advisory, workers=self.parse_workers),
+        ]
+        if filters is not None and filters.filters_packages:
+            # drops the advisories fixing none of the packages before their models are built
+            stages.append(Stage("packages", match_packages))
+        stages.append(Stage("build", partial(self.build_summary, trusted=trusted), workers=self.build_workers))
+        if self.normalize:
+            stages.append(Stage("normalize", normalize_summary))
+        if self.sink is not None:
+            stages.append(Stage("sink", partial(self.emit, version=version)))
+        return Pipeline(*stages)
+
+    def list_summary(self, item, version: str, trusted: bool = False) -> Summary:
+        """lazy mode: the summary of an rss item, its fixes are loaded on demand by fetch_fixes"""
+        summary = Summary.from_item(item, trusted)
+        if self.normalize:
+            summary = normalize_summary(summary)
+        summary._loader = partial(self.fetch_fixes, version=version)
+        return summary
+
+    async def fetch_fixes(self, summary: Summary, version: str) -> Summary:
+        """download and parse the advisory page of a lazily listed summary and fill in its fixes"""
+        html = await self.download(summary.url.strip(), self.workspace / "html" / summary.id)
+        with self.instrumentation.span("parse"):
+            names = await self.parse_executor.parse(html)
+        with self.instrumentation.span("validate"):
+            fixes = [AlasFixedIn.parse_obj({"name": name}) for name in names]
+        summary.fixes = normalize_fixes(fixes) if self.normalize else fixes
+        if self.sink is not None:
+            await self.emit(summary, version)
+        return summary
+
+    async def hydrate(self, summaries: Iterable[Summary]) -> List[Summary]:
+        """
+        load the fixes of lazily listed summaries in bulk, on the driver's scheduler
+        :returns: the summaries whose fixes could not be loaded, they keep fixes None and can be hydrated again
+        """
+        failed = []
+
+        async def load(summary: Summary):
             try:
-                result = await fut
-                yield result
+                await summary.load_fixes()
             except Exception as err:
-                print(err)
+                print(f"hydrate {summary.id}: {err}")
+                failed.append(summary)
+
+        pending = [summary for summary in summaries if summary.fixes is None]
+        async for fut in self.scheduler.as_completed(load, pending):
+            await fut
+        return failed
+
+    def queue_retry(self, item, err: Exception):
+        """fetch stage errors: the rss item is fetched again once the rest of the feed is done"""
+        self.retry_queue.append(item)
+
+    async def process_summary(self, item) -> Summary:
+        """fetch, parse and build a single advisory outside of the pipeline"""
+        return self.build_summary(await self.parse_advisory(await self.fetch_advisory(item)))
+
+    def report(self) -> dict:
+        """machine readable report: pipeline stage stats per release, span histograms and loop monitor"""
+        report = {
+            "stages": {version: pipeline.report() for version, pipeline in self.pipelines.items()},
+            "spans": self.instrumentation.report(),
+        }
+        if self.monitor is not None:
+            report["loop"] = self.monitor.report()
+        report["retry"] = self.retry_policy.report()
+        report["failed"] = [item_id(item) for item in self.failed]
+        return report
+
+    async def changed_items(self, items, pending: dict) -> AsyncGenerator:
+        """
+        drop the rss items that did not change since the last sync
+        :param pending: filled with ALAS id -> (item hash, pubDate) for every item in the feed
+        """
+        async for item in items:
+            alas_id = item_id(item)
+            digest = item_digest(item)
+            pending[alas_id] = (digest, item.get("pubDate"))
+            if self.state.is_changed(alas_id, digest):
+                yield item
+
+    async def download(self, url: str, output_path: Optional[Path]) -> str:
+        """
+        body of url: read back from the store when offline, otherwise downloaded (through the cache when there is
+        one) and recorded in the store, which then replaces the per page files
+        """
+        if self.offline:
+            return (await self.store.get_name(url)).decode()
+        if self.store is not None and self.cache is None:
+            output_path = None
+        with self.instrumentation.span("download"):
+            content = await self.retry_policy.call(
+                download_remote_file, url, output_path, client=self.client, cache=self.cache
+            )
+        if self.store is not None:
+            await self.store.put(content.encode(), url)
+        return content
+
+    async def read_feed(self, url: str, version) -> Optional[bytes]:
+        """
+        the whole feed when it is read at once: revalidated through the cache, or from the store offline
+        :returns: None when the feed is streamed instead, see feed_items
+        """
+        if not self.offline and self.cache is None:
+            return None
+        return (await self.download(url, self.workspace / f"{version}_rss.xml")).encode()
+
+    def validated_path(self, version) -> Path:
+        return self.workspace / f"{version}_rss.xml.validated"
+
+    async def is_validated(self, version, content: bytes) -> bool:
+        """every item of this very feed was validated into a summary by a previous extract, see mark_validated"""
+        try:
+            async with aiofiles.open(self.validated_path(version), "r") as fp:
+                return await fp.read() == feed_digest(content)
+        except FileNotFoundError:
+            return False
+
+    async def mark_validated(self, version, content: bytes):
+        async with aiofiles.open(self.validated_path(version), "w") as fp:
+            await fp.write(feed_digest(content))
+
+    async def feed_items(self, url: str, version, content: Optional[bytes] = None) -> AsyncGenerator:
+        """
+        yield the rss items while the feed is downloading, so advisory fetches start before the feed is complete,
+        or the items of content when the feed was read at once by read_feed
+        """
+        if content is not None:
+            for item in parse_items(content):
+                yield item
+            return
+
+        output_path = self.workspace / f"{version}_rss.xml"
+
+        recorded = []
+
+        async def stream(timeout: float) -> AsyncGenerator:
+            # every attempt of the retry policy parses the feed from its start
+            recorded.clear()
+
+            async def chunks():
+                async for chunk in stream_remote_file(
+                    url, output_path if self.store is None else None, client=self.client, timeout=timeout
+                ):
+                    if self.store is not None:
+                        recorded.append(chunk)
+                    yield chunk
+
+            async for item in stream_items(chunks()):
+                yield item
+
+        # items yielded before an attempt failed are not yielded again by the next one
+        seen = set()
+        async for item in self.retry_policy.stream(stream):
+            alas_id = item_id(item)
+            if alas_id not in seen:
+                seen.add(alas_id)
+                yield item
+        if self.store is not None:
+            await self.store.put(b"".join(recorded), url)
+
+    async def matching_items(self, items, filters: FilterSpec) -> AsyncGenerator:
+        """drop the rss items the filters reject, before their advisory pages are scheduled"""
+        async for item in items:
+            if filters.match_item(item):
+                yield item
+
+    async def extract(self, url: str, version: str, filters: Optional[FilterSpec] = None) -> AsyncGenerator:
+        """
+        :param filters: FilterSpec of the advisories to extract, in lazy mode only its rss item predicates apply
+        """
+        if self.monitor is not None:
+            await self.monitor.start()
+        content = await self.read_feed(url, version)
+        # local to this extract, a driver may extract several feeds at once
+        trusted = content is not None and await self.is_validated(version, content)
+        items = self.feed_items(url, version, content)
+        pending = {}
+        if self.state is not None and not self.lazy:
+            await self.state.load()
+            items = self.changed_items(items, pending)
+        if filters is not None and filters.filters_items:
+            # behind changed_items, so pending still holds every advisory of the feed and deletions stay correct
+            items = self.matching_items(items, filters)
+        # every item of the feed gets built, unless filtered out (the ones unchanged since the state's sync were)
+        builds_all = filters is None or not (filters.filters_items or filters.filters_packages)
+        if self.lazy:
+            async for item in items:
+                yield self.list_summary(item, version, trusted)
+            if content is not None and builds_all and not trusted:
+                await self.mark_validated(version, content)
+            return
+        pipeline = self.pipelines[version] = self.build_pipeline(version, filters, trusted, pending)
+        try:
+            for retry_round in range(self.retry_rounds + 1):
+                async for result in pipeline.run(items):
+                    if self.state is not None:
+                        self.state.update(result.id, *pending[result.id], version)
+                    yield result
+                if not self.retry_queue or retry_round == self.retry_rounds:
+                    break
+                items, self.retry_queue = self.retry_queue, []
+            built = not self.retry_queue and all(
+                stage.stats.errors == 0 for stage in pipeline.stages if stage.name != "fetch"
+            )
+            # still failing: not recorded in the state, so the next sync tries them again
+            self.failed.extend(self.retry_queue)
+            self.retry_queue = []
+            if content is not None and builds_all and built and not trusted:
+                await self.mark_validated(version, content)
+
+            if self.state is not None:
+                deleted = self.state.deleted(version, pending)
+                self.state.remove(deleted)
+                if self.report_deletions:
+                    for alas_id in sorted(deleted):
+                        yield DeletedSummary(id=alas_id)
+        finally:
+            if self.state is not None:
+                await self.state.save()
+
+
+class AmazonParser(ParserBase):
+    """ALAS feed of one Amazon Linux release, extracted by an AmazonFeedDriver built from the orchestrator's options"""
+
+    version: str = None
+
+    def __init__(self, workspace: Path, url: str = None, filters: Optional[FilterSpec] = None, **options):
+        super().__init__(workspace, url, **options)
+        self.filters = filters
+        self.driver: Optional[AmazonFeedDriver] = None
+
+    def get_url(self, url: str = None):
+        return url or self.url
+
+    async def parse(self) -> AsyncGenerator:
+        workspace = self.workspace / self.version
+        (workspace / "html").mkdir(parents=True, exist_ok=True)
+        async with AmazonFeedDriver(workspace, **self.options) as driver:
+            self.driver = driver
+            async for summary in driver.extract(self.get_url(), self.version, self.filters):
+                yield summary
+
+    def report(self) -> dict:
+        return self.driver.report() if self.driver is not None else {}
+
+
+class AmazonLinux1Parser(AmazonParser):
+    name = "amzn:1"
+    url = "https://alas.aws.amazon.com/alas.rss"
+    version = "1"
+
+
+class AmazonLinux2Parser(AmazonParser):
+    name = "amzn:2"
+    url = "https://alas.aws.amazon.com/AL2/alas.rss"
+    version = "2"
+
+
+class AmazonLinux2022Parser(AmazonParser):
+    name = "amzn:2022"
+    url = "https://alas.aws.amazon.com/AL2022/alas.rss"
+    version = "2022"
+
+
+# feeds AmazonFeedDriver.items() extracts one after the other, see orchestrator.Orchestrator to run them concurrently
+amazon_security_advisories = {
+    parser.version: parser.url for parser in (AmazonLinux1Parser, AmazonLinux2Parser, AmazonLinux2022Parser)
+}
 
 
 async def main():
     summary_count = 0
 
     print("starting amazon3 async driver")
-    start_time = time.time()
-    afd = AmazonFeedDriver(driver_workspace)
-    async for item in afd.items():
-        print(item.id)  # change-me
+    start_time = time.perf_counter()
+    async with AmazonFeedDriver(driver_workspace, monitor=LoopMonitor()) as afd:
+        async for _ in afd.items():
+            summary_count += 1
+        report = afd.report()
+        del report["spans"]
+        report_path = driver_workspace / "report.json"
+        afd.instrumentation.write_report(report_path, **report)
 
-    print("--- %s seconds ---" % (time.time() - start_time))
+    print("--- %s seconds ---" % (time.perf_counter() - start_time))
+    print(f"--report written to {report_path}")
 
     print(f"--processed {summary_count} summaries.")
 
 
 if __name__ == "__main__":
+    import uvloop
+
     asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     asyncio.run(main())
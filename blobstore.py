@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+"""
+Content addressed store for raw advisory pages: bodies are keyed by their sha256, compressed, stored once however
+many urls point at them, and packed into large segment files instead of one small file per advisory
+"""
+
+
+class BlobStore:
+    """
+    root/
+        segments/000001.seg ...  appended zlib compressed bodies, a new segment is started past segment_size
+        index.jsonl              append only log of blob locations {"d", "s", "o", "l"} and names {"r", "d"}
+
+    Names (usually urls) map to the digest of their latest body, which is what an offline replay reads back.
+    Compression and file access run in worker threads, appends are serialized by a lock.
+    """
+
+    def __init__(self, root: Path, segment_size: int = 64 << 20, level: int = 6):
+        self.root = root
+        self.segment_size = segment_size
+        self.level = level
+        self.blobs: Dict[str, Tuple[int, int, int]] = {}
+        self.names: Dict[str, str] = {}
+        self.duplicates = 0
+        self._segment = 0
+        self._segment_fp = None
+        self._index_fp = None
+        self._fds: Dict[int, int] = {}
+        self._lock = asyncio.Lock()
+        self._fds_lock = threading.Lock()
+        self._open_task = None
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / "index.jsonl"
+
+    def segment_path(self, segment: int) -> Path:
+        return self.root / "segments" / f"{segment:06}.seg"
+
+    def _open(self):
+        (self.root / "segments").mkdir(parents=True, exist_ok=True)
+        if self.index_path.exists():
+            with open(self.index_path, "r") as fp:
+                for line in fp:
+                    entry = json.loads(line)
+                    if "r" in entry:
+                        self.names[entry["r"]] = entry["d"]
+                    else:
+                        self.blobs[entry["d"]] = (entry["s"], entry["o"], entry["l"])
+                        self._segment = max(self._segment, entry["s"])
+        self._segment = max(self._segment, 1)
+        self._segment_fp = open(self.segment_path(self._segment), "ab")
+        self._index_fp = open(self.index_path, "a")
+
+    async def open(self) -> "BlobStore":
+        if self._open_task is None:
+            self._open_task = asyncio.ensure_future(asyncio.to_thread(self._open))
+        await self._open_task
+        return self
+
+    def _log(self, entry: dict):
+        self._index_fp.write(json.dumps(entry) + "\n")
+        self._index_fp.flush()
+
+    def _append(self, digest: str, body: bytes, name: Optional[str]):
+        if digest not in self.blobs:
+            data = zlib.compress(body, self.level)
+            if self._segment_fp.tell() + len(data) > self.segment_size and self._segment_fp.tell():
+                self._segment_fp.close()
+                self._segment += 1
+                self._segment_fp = open(self.segment_path(self._segment), "ab")
+            offset = self._segment_fp.tell()
+            self._segment_fp.write(data)
+            self._segment_fp.flush()
+            self.blobs[digest] = (self._segment, offset, len(data))
+            self._log({"d": digest, "s": self._segment, "o": offset, "l": len(data)})
+        else:
+            self.duplicates += 1
+        if name is not None and self.names.get(name) != digest:
+            self.names[name] = digest
+            self._log({"r": name, "d": digest})
+
+    async def put(self, body: bytes, name: Optional[str] = None) -> str:
+        """store body once, optionally under a name, and return its digest"""
+        await self.open()
+        digest = hashlib.sha256(body).hexdigest()
+        async with self._lock:
+            await asyncio.to_thread(self._append, digest, body, name)
+        return digest
+
+    def _read(self, segment: int, offset: int, length: int) -> bytes:
+        with self._fds_lock:
+            if segment not in self._fds:
+                self._fds[segment] = os.open(self.segment_path(segment), os.O_RDONLY)
+        return zlib.decompress(os.pread(self._fds[segment], length, offset))
+
+    async def get(self, digest: str) -> bytes:
+        await self.open()
+        return await asyncio.to_thread(self._read, *self.blobs[digest])
+
+    async def get_name(self, name: str) -> bytes:
+        """latest body stored under name, raises KeyError when there is none"""
+        await self.open()
+        return await self.get(self.names[name])
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self.blobs
+
+    def _close(self):
+        for fp in (self._segment_fp, self._index_fp):
+            if fp is not None:
+                fp.close()
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+
+    async def close(self):
+        if self._open_task is not None:
+            await self._open_task
+            await asyncio.to_thread(self._close)
+            self._open_task = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import aiofiles
+
+"""
+On disk http cache for the feed and advisory pages, using conditional GETs (ETag / Last-Modified)
+"""
+
+
+class CacheEntry:
+    __slots__ = ("etag", "last_modified", "stored_at", "used_at", "size")
+
+    def __init__(self, etag=None, last_modified=None, stored_at=0.0, used_at=0.0, size=0):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.used_at = used_at
+        self.size = size
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class HttpCache:
+    """
+    Cache policy over the files a driver downloads. The body stays at the path the driver writes it to and the
+    response validators are stored next to it in <path>.meta.json.
+
+    - a stored page is revalidated with If-None-Match / If-Modified-Since, a 304 is served from disk
+    - max_age: seconds a stored page is considered fresh and served without touching the network
+    - max_size: bytes of cached bodies under root to keep, the least recently used pages are evicted above it,
+      except the ones a download in flight is about to read; a body gone anyway (e.g. removed by another process)
+      is downloaded again as a miss
+    """
+
+    meta_suffix = ".meta.json"
+
+    def __init__(self, root: Path, max_age: Optional[float] = None, max_size: Optional[int] = None):
+        self.root = root
+        self.max_age = max_age
+        self.max_size = max_size
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._entries: Dict[Path, CacheEntry] = {}
+        self._size = 0
+        # path -> downloads of it in flight, their entries are not evicted
+        self._readers: Dict[Path, int] = {}
+        self._index_task = None
+
+    @classmethod
+    def meta_path(cls, path: Path) -> Path:
+        return path.with_name(path.name + cls.meta_suffix)
+
+    def _scan(self):
+        entries = {}
+        for meta_path in self.root.rglob("*" + self.meta_suffix):
+            path = meta_path.with_name(meta_path.name[: -len(self.meta_suffix)])
+            if path.exists():
+                entries[path] = CacheEntry(**json.loads(meta_path.read_text()))
+        return entries
+
+    async def _load_entry(self, path: Path) -> Optional[CacheEntry]:
+        if self._index_task is None:
+            # index what previous runs left under root once, so max_size also covers them
+            self._index_task = asyncio.ensure_future(self._load_index())
+        await self._index_task
+        return self._entries.get(path)
+
+    async def _load_index(self):
+        for path, entry in (await asyncio.to_thread(self._scan)).items():
+            if path not in self._entries:
+                self._add(path, entry)
+        await self._evict()
+
+    async def _read_body(self, path: Path) -> str:
+        async with aiofiles.open(path, "r", encoding="utf-8") as fp:
+            return await fp.read()
+
+    async def _read_stored(self, path: Path) -> Optional[str]:
+        """the stored body, None (and the entry dropped) when it is gone"""
+        try:
+            return await self._read_body(path)
+        except FileNotFoundError:
+            self._discard(path)
+            return None
+
+    async def _store(self, path: Path, resp) -> str:
+        text = resp.text
+        entry = CacheEntry(
+            etag=resp.headers.get("etag"),
+            last_modified=resp.headers.get("last-modified"),
+            stored_at=time.time(),
+            used_at=time.time(),
+            size=len(resp.content),
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        async with aiofiles.open(path, "w", encoding="utf-8") as fp:
+            await fp.write(text)
+        await self._write_meta(path, entry)
+        self._discard(path)
+        self._add(path, entry)
+        await self._evict()
+        return text
+
+    async def _write_meta(self, path: Path, entry: CacheEntry):
+        async with aiofiles.open(self.meta_path(path), "w") as fp:
+            await fp.write(json.dumps(entry.to_dict()))
+
+    def _add(self, path: Path, entry: CacheEntry):
+        self._entries[path] = entry
+        self._size += entry.size
+
+    def _discard(self, path: Path):
+        entry = self._entries.pop(path, None)
+        if entry:
+            self._size -= entry.size
+
+    async def _evict(self):
+        if self.max_size is None or self._size <= self.max_size:
+            return
+        for path, _ in sorted(self._entries.items(), key=lambda kv: kv[1].used_at):
+            if self._size <= self.max_size:
+                break
+            if path in self._readers:
+                continue
+            self._discard(path)
+            await asyncio.to_thread(self._unlink, path)
+
+    def _unlink(self, path: Path):
+        path.unlink(missing_ok=True)
+        self.meta_path(path).unlink(missing_ok=True)
+
+    async def download(self, url: str, output_path: Path, client, timeout: float = 125) -> str:
+        """return the body of url, from output_path when the stored copy is fresh or the server answers 304"""
+        self._readers[output_path] = self._readers.get(output_path, 0) + 1
+        try:
+            return await self._download(url, output_path, client, timeout)
+        finally:
+            readers = self._readers.pop(output_path) - 1
+            if readers:
+                self._readers[output_path] = readers
+            else:
+                # evictable again, in case an eviction skipped it
+                await self._evict()
+
+    async def _download(self, url: str, output_path: Path, client, timeout: float) -> str:
+        entry = await self._load_entry(output_path)
+        headers = {}
+        if entry and self.max_age is not None and time.time() - entry.stored_at < self.max_age:
+            text = await self._read_stored(output_path)
+            if text is not None:
+                self.hits += 1
+                entry.used_at = time.time()
+                return text
+            entry = None
+        if entry:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        resp = await client.get(url, headers=headers, timeout=timeout, follow_redirects=True)
+        if resp.status_code == 304 and entry:
+            text = await self._read_stored(output_path)
+            if text is not None:
+                self.revalidated += 1
+                entry.stored_at = entry.used_at = time.time()
+                await self._write_meta(output_path, entry)
+                return text
+            # validated a body that is gone, download it again
+            resp = await client.get(url, timeout=timeout, follow_redirects=True)
+
+        resp.raise_for_status()  # will raise any 4xx or 5xx  response codes as exceptions
+        self.misses += 1
+        return await self._store(output_path, resp)
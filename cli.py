@@ -0,0 +1,145 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+"""
+Command line entry point of the feed drivers, for the cron triggered syncs:
+
+    python -m cli drivers
+    python -m cli sync --driver amazon3 --parser process --sink ndjson --compression gzip --incremental
+
+Only argparse is imported up front. The driver, parser backend and sink are picked by name and imported once the
+command selected them, with the libraries behind them (pydantic, httpx, bs4, xmltodict, aiohttp, uvloop...), so a
+short incremental sync does not pay for the ones it does not use. perf_imports.py measures it.
+"""
+
+drivers = {
+    "amazon": "first asyncio driver: aiohttp, xmltodict and BeautifulSoup",
+    "amazon2": "asyncio driver with concurrent advisory downloads: aiohttp, xmltodict and BeautifulSoup",
+    "amazon3": "AmazonFeedDriver: httpx, pydantic and the staged pipeline, supports --parser, --sink, --incremental",
+}
+
+parser_backends = ("inline", "thread", "process")
+
+sinks = ("none", "ndjson", "sqlite")
+
+default_outputs = {"ndjson": "records.ndjson", "sqlite": "records.db"}
+
+releases = ("1", "2", "2022")
+
+
+async def sync_legacy(args) -> int:
+    """amazon and amazon2 only read the AL2 feed, without any of the amazon3 options"""
+    import importlib
+
+    module = importlib.import_module(args.driver)
+    if args.url:
+        module.amazon_security_advisories = {"2": args.url}
+    count = 0
+    async for _ in module.items():
+        count += 1
+    return count
+
+
+async def sync_amazon3(args) -> int:
+    from contextlib import AsyncExitStack
+
+    import amazon3
+    from fixes import ParseExecutor
+
+    args.workspace.joinpath("html").mkdir(parents=True, exist_ok=True)
+    feeds = {version: url for version, url in amazon3.amazon_security_advisories.items() if version in args.release}
+    if args.url:
+        feeds = {version: args.url for version in feeds}
+
+    options = {}
+    if args.incremental:
+        from sync_state import SyncState
+
+        options["state"] = SyncState(args.workspace / "state.json")
+    async with AsyncExitStack() as stack:
+        if args.sink != "none":
+            options["sink"] = await stack.enter_async_context(make_sink(args))
+        driver = await stack.enter_async_context(
+            amazon3.AmazonFeedDriver(args.workspace, parse_executor=ParseExecutor(args.parser), **options)
+        )
+        count = 0
+        for version, url in feeds.items():
+            async for _ in driver.extract(url, version):
+                count += 1
+        if driver.failed:
+            print(f"--{len(driver.failed)} advisories failed: {', '.join(driver.report()['failed'])}")
+        return count
+
+
+def make_sink(args):
+    output = args.output or args.workspace / default_outputs[args.sink]
+    if args.sink == "sqlite":
+        from sinks import SqliteSink
+
+        return SqliteSink(output)
+    from sinks import NdjsonSink
+
+    return NdjsonSink(output, compression=args.compression)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    arg_parser = argparse.ArgumentParser(prog="python -m cli", description="Amazon Linux ALAS feed drivers")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("drivers", help="list the drivers")
+
+    sync_parser = commands.add_parser("sync", help="sync the ALAS feeds with one of the drivers")
+    sync_parser.add_argument("--driver", choices=sorted(drivers), default="amazon3")
+    sync_parser.add_argument(
+        "--parser", choices=parser_backends, default="inline", help="where advisory pages are parsed"
+    )
+    sync_parser.add_argument("--sink", choices=sinks, default="none", help="where the records are written")
+    sync_parser.add_argument("--output", type=Path, help="file of the sink, in the workspace by default")
+    sync_parser.add_argument("--compression", choices=("gzip", "zstd"), help="of the ndjson sink")
+    sync_parser.add_argument("--workspace", type=Path, default=Path("/tmp/amazon3"))
+    sync_parser.add_argument(
+        "--release", action="append", choices=releases, help="Amazon Linux release to sync, repeatable, all by default"
+    )
+    sync_parser.add_argument("--url", help="url replacing the feed url, e.g. a mirror, with a single release")
+    sync_parser.add_argument("--incremental", action="store_true", help="only process the advisories that changed")
+    sync_parser.add_argument("--uvloop", action="store_true", help="run on uvloop")
+    return arg_parser
+
+
+def main(argv=None) -> int:
+    arg_parser = build_arg_parser()
+    args = arg_parser.parse_args(argv)
+
+    if args.command == "drivers":
+        for name, description in drivers.items():
+            print(f"{name:<8} {description}")
+        return 0
+
+    if args.driver != "amazon3" and (
+        args.parser != "inline" or args.sink != "none" or args.incremental or args.release
+    ):
+        arg_parser.error("--parser, --sink, --incremental and --release need the amazon3 driver")
+    if args.compression and args.sink != "ndjson":
+        arg_parser.error("--compression needs the ndjson sink")
+    if args.driver == "amazon3":
+        args.release = args.release or list(releases)
+        if args.url and len(args.release) != 1:
+            arg_parser.error("--url needs a single --release")
+
+    import asyncio
+
+    if args.uvloop:
+        import uvloop
+
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    start_time = time.perf_counter()
+    summary_count = asyncio.run(sync_amazon3(args) if args.driver == "amazon3" else sync_legacy(args))
+    print("--- %s seconds ---" % (time.perf_counter() - start_time))
+    print(f"--processed {summary_count} summaries.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
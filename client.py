@@ -0,0 +1,89 @@
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+
+"""
+Long lived, pooled http client shared by the feed drivers
+"""
+
+
+class PooledClient:
+    """
+    Wraps a single httpx.AsyncClient so that every download made by a driver reuses the same connection pool
+    (keep-alive, one TLS handshake per host) instead of opening a new client per url.
+
+    httpx only limits the total number of connections, so the per host limit is enforced here with one semaphore
+    per host.
+
+    shards: number of httpx clients the connections are split over, each request goes to the least busy one. The
+    bookkeeping of an httpx pool grows with the square of its connections, past a few dozen connections several
+    smaller pools are much cheaper than a single large one.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_connections_per_host: int = 20,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 5.0,
+        http2: bool = False,
+        timeout: float = 125,
+        shards: int = 1,
+    ):
+        self.max_connections_per_host = max_connections_per_host
+        self._host_limits = defaultdict(
+            lambda: asyncio.Semaphore(self.max_connections_per_host)
+        )
+        # http2 requires the h2 package (pip install httpx[http2])
+        self._clients = [
+            httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=-(-max_connections // shards),
+                    max_keepalive_connections=-(-max_keepalive_connections // shards),
+                    keepalive_expiry=keepalive_expiry,
+                ),
+                http2=http2,
+                timeout=timeout,
+                follow_redirects=True,
+            )
+            for _ in range(shards)
+        ]
+        self._in_flight = [0] * shards
+
+    @property
+    def is_closed(self) -> bool:
+        return all(client.is_closed for client in self._clients)
+
+    @asynccontextmanager
+    async def _shard(self, url: str):
+        async with self._host_limits[urlsplit(url).netloc]:
+            shard = self._in_flight.index(min(self._in_flight))
+            self._in_flight[shard] += 1
+            try:
+                yield self._clients[shard]
+            finally:
+                self._in_flight[shard] -= 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        async with self._shard(url) as client:
+            return await client.get(url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, url: str, **kwargs):
+        """stream the response body, the host slot stays taken until the body was read"""
+        async with self._shard(url) as client:
+            async with client.stream("GET", url, **kwargs) as resp:
+                yield resp
+
+    async def aclose(self):
+        await asyncio.gather(*(client.aclose() for client in self._clients))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
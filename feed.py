@@ -0,0 +1,58 @@
+from typing import AsyncGenerator, AsyncIterable, List, Optional
+from xml.etree.ElementTree import XMLPullParser
+
+"""
+Incremental rss parser: yields each <item> as soon as its closing tag was read, instead of building the whole
+document with xmltodict.parse first
+"""
+
+
+class FeedReader:
+    """
+    Pull parser over rss chunks. Every finished <item> is turned into a dict of child tag -> stripped text (the same
+    shape xmltodict gives for the ALAS items) and dropped from the tree, so memory does not grow with the feed.
+    """
+
+    def __init__(self):
+        self._parser = XMLPullParser(events=("start", "end"))
+        self._channel = None
+
+    def feed(self, chunk) -> List[dict]:
+        self._parser.feed(chunk)
+        return self._read_items()
+
+    def close(self) -> List[dict]:
+        self._parser.close()
+        return self._read_items()
+
+    def _read_items(self) -> List[dict]:
+        items = []
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if elem.tag == "channel":
+                    self._channel = elem
+            elif elem.tag == "item":
+                items.append({child.tag: _text(child) for child in elem})
+                if self._channel is not None:
+                    self._channel.remove(elem)
+        return items
+
+
+def _text(elem) -> Optional[str]:
+    return elem.text.strip() if elem.text and elem.text.strip() else None
+
+
+def parse_items(content) -> List[dict]:
+    """all the items of an rss document already in memory"""
+    reader = FeedReader()
+    return reader.feed(content) + reader.close()
+
+
+async def stream_items(chunks: AsyncIterable) -> AsyncGenerator:
+    """yield the items of an rss document while its chunks arrive"""
+    reader = FeedReader()
+    async for chunk in chunks:
+        for item in reader.feed(chunk):
+            yield item
+    for item in reader.close():
+        yield item
@@ -0,0 +1,148 @@
+import fnmatch
+import re
+import zlib
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Optional, Tuple
+
+import nevra
+from normalize import normalize_severity
+
+"""
+Filter spec for the advisories a driver extracts. The predicates on fields of the rss item are checked before any
+advisory page is fetched, the package predicates right after the fixes were extracted from the page.
+"""
+
+# the year and number end every id, whatever comes before them: ALAS2-2021-1234, ALAS2KERNEL-5.10-2022-003
+alas_id_pattern = re.compile(r"-(\d{4})-(\d+)$")
+
+
+def alas_id_key(alas_id: str) -> Optional[Tuple[int, int]]:
+    """'ALAS2-2021-1234' -> (2021, 1234), ordering ids the same way across releases, None for an unknown id format"""
+    found = alas_id_pattern.search(alas_id)
+    if not found:
+        return None
+    return int(found.group(1)), int(found.group(2))
+
+
+def parse_id_bound(alas_id: Optional[str]) -> Optional[Tuple[int, int]]:
+    if not alas_id:
+        return None
+    key = alas_id_key(alas_id)
+    if key is None:
+        raise ValueError("Invalid ALAS id: {}".format(alas_id))
+    return key
+
+
+def as_utc(value: datetime) -> datetime:
+    """naive datetimes are taken as UTC, so they compare with the timezone aware pubDates"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def shard_of(alas_id: str, shards: int) -> int:
+    """shard of an advisory, stable across processes, hosts and runs (unlike hash()) as long as shards is"""
+    return zlib.crc32(alas_id.encode()) % shards
+
+
+class FilterSpec:
+    """
+    Every predicate given has to match, predicates left to None match everything:
+
+    - severities: severities to keep, ALAS ("important") or normalized ("High") names
+    - cves: keep advisories fixing at least one of these CVE ids
+    - published_after, published_before: inclusive bounds of the item's pubDate, naive datetimes are taken as UTC
+    - min_id, max_id: inclusive ALAS id range, compared by year and number
+    - packages: fnmatch globs, keep advisories fixing at least one package whose name matches
+    - shard: (index, shards), keep the advisories of one shard of the feed, see shard_of
+    """
+
+    __slots__ = (
+        "severities",
+        "cves",
+        "published_after",
+        "published_before",
+        "min_key",
+        "max_key",
+        "packages",
+        "shard",
+    )
+
+    def __init__(
+        self,
+        severities: Optional[Iterable[str]] = None,
+        cves: Optional[Iterable[str]] = None,
+        published_after: Optional[datetime] = None,
+        published_before: Optional[datetime] = None,
+        min_id: Optional[str] = None,
+        max_id: Optional[str] = None,
+        packages: Optional[Iterable[str]] = None,
+        shard: Optional[Tuple[int, int]] = None,
+    ):
+        self.severities = frozenset(normalize_severity(sev) for sev in severities) if severities is not None else None
+        self.cves = frozenset(cves) if cves is not None else None
+        self.published_after = as_utc(published_after) if published_after is not None else None
+        self.published_before = as_utc(published_before) if published_before is not None else None
+        self.min_key = parse_id_bound(min_id)
+        self.max_key = parse_id_bound(max_id)
+        self.packages = re.compile("|".join(fnmatch.translate(glob) for glob in packages)) if packages else None
+        if shard is not None and not 0 <= shard[0] < shard[1]:
+            raise ValueError("Invalid shard: {}".format(shard))
+        self.shard = shard
+
+    @property
+    def filters_items(self) -> bool:
+        return any(
+            value is not None
+            for value in (
+                self.severities,
+                self.cves,
+                self.published_after,
+                self.published_before,
+                self.min_key,
+                self.max_key,
+                self.shard,
+            )
+        )
+
+    @property
+    def filters_packages(self) -> bool:
+        return self.packages is not None
+
+    def match_item(self, item: dict) -> bool:
+        """the predicates answered by the rss item alone"""
+        words = item["title"].split(" ", 2)
+        if self.shard is not None and shard_of(words[0], self.shard[1]) != self.shard[0]:
+            return False
+        if self.severities is not None:
+            sev = words[1].strip("():") if len(words) > 1 else None
+            if normalize_severity(sev) not in self.severities:
+                return False
+        if self.cves is not None:
+            description = item.get("description") or ""
+            if self.cves.isdisjoint(cve.strip() for cve in description.split(",")):
+                return False
+        if self.min_key is not None or self.max_key is not None:
+            key = alas_id_key(words[0])
+            # an id the range cannot place is out of it
+            if key is None:
+                return False
+            if (self.min_key is not None and key < self.min_key) or (self.max_key is not None and key > self.max_key):
+                return False
+        if self.published_after is not None or self.published_before is not None:
+            pub_date = item.get("pubDate")
+            if not pub_date:
+                return False
+            # naive for a -0000 zone
+            published = as_utc(parsedate_to_datetime(pub_date))
+            if (self.published_after is not None and published < self.published_after) or (
+                self.published_before is not None and published > self.published_before
+            ):
+                return False
+        return True
+
+    def match_fixes(self, names: Iterable[str]) -> bool:
+        """the package predicates, over the fixes (name-version-release.arch) extracted from the advisory page"""
+        if self.packages is None:
+            return True
+        match = self.packages.match
+        return any(match(nevra.split(name).name) for name in names)
@@ -0,0 +1,128 @@
+import asyncio
+import html
+import re
+from concurrent.futures import Executor
+from typing import List, Optional, Sequence, Tuple
+
+"""
+Extraction of the fixed packages from ALAS advisory pages, runnable inline, in a thread pool or in a process pool
+"""
+
+arches = ("aarch64", "i686", "noarch", "src", "x86_64")
+arch_suffixes = tuple(f".{arch}" for arch in arches)
+
+new_packages_pattern = re.compile(r"""id=["']?new_packages\b""")
+tag_pattern = re.compile(r"<[^>]*>")
+
+
+def extract_fixes(alas_html) -> Tuple[str, ...]:
+    """
+    return the package names (name-version-release.arch) of every architecture listed in the #new_packages div of an
+    advisory page (str or raw bytes)
+
+    Only the #new_packages div is read: it is located with a precompiled pattern instead of parsing the whole page,
+    and its text is scanned once for every whitespace delimited name ending with a known arch.
+    """
+    if isinstance(alas_html, bytes):
+        alas_html = alas_html.decode("utf-8", "replace")
+    found = new_packages_pattern.search(alas_html)
+    if not found:
+        return ()
+    start = alas_html.find(">", found.end()) + 1
+    end = alas_html.find("</div>", start)
+    text = html.unescape(tag_pattern.sub(" ", alas_html[start : end if end != -1 else None]))
+    return tuple(name for name in text.split() if name.endswith(arch_suffixes))
+
+
+def extract_fixes_batch(pages: Sequence) -> List[Tuple[str, ...]]:
+    """extract_fixes over a batch of pages, so a pool worker is sent many pages per round trip"""
+    return [extract_fixes(page) for page in pages]
+
+
+class ParseExecutor:
+    """
+    Runs extract_fixes away from the event loop.
+
+    - mode "inline": parse directly in the calling coroutine (blocks the loop, lowest overhead)
+    - mode "thread": parse in a thread pool
+    - mode "process": parse in a process pool, pages are sent in batches and only tuples of strings come back,
+      so no pydantic object is ever pickled
+    - batch_size / batch_delay: pages are queued until batch_size pages are waiting or batch_delay seconds passed
+    """
+
+    modes = ("inline", "thread", "process")
+
+    def __init__(
+        self,
+        mode: str = "inline",
+        workers: Optional[int] = None,
+        batch_size: int = 16,
+        batch_delay: float = 0.005,
+    ):
+        if mode not in self.modes:
+            raise ValueError("Invalid parse executor mode: {}".format(mode))
+        self.mode = mode
+        self.workers = workers
+        self.batch_size = batch_size if mode == "process" else 1
+        self.batch_delay = batch_delay
+        self._executor: Optional[Executor] = None
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+
+    @property
+    def executor(self) -> Optional[Executor]:
+        if self._executor is None:
+            # imported on first use, the process pool pulls in multiprocessing
+            if self.mode == "thread":
+                from concurrent.futures import ThreadPoolExecutor
+
+                self._executor = ThreadPoolExecutor(self.workers)
+            elif self.mode == "process":
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._executor = ProcessPoolExecutor(self.workers)
+        return self._executor
+
+    async def parse(self, alas_html) -> Tuple[str, ...]:
+        if self.mode == "inline":
+            return extract_fixes(alas_html)
+
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((alas_html, fut))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_delay, self._flush)
+        return await fut
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self.executor, extract_fixes_batch, [page for page, _ in batch]
+            )
+        except Exception as err:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(err)
+            return
+        for (_, fut), fixes in zip(batch, results):
+            if not fut.done():
+                fut.set_result(fixes)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,232 @@
+import mmap
+import struct
+from collections import defaultdict, namedtuple
+from pathlib import Path
+from typing import AsyncIterable, Dict, List
+
+import nevra
+from versions import evr_key
+
+"""
+Inverted index of the advisories: package name -> fixes sorted by version, and CVE -> ALAS ids. It is written in
+a compact binary format that is memory mapped for lookups, so scanners never reload the whole feed.
+
+Layout (little endian):
+    header    magic, package count, cve count, then the offsets of the sections below
+    packages  sorted fixed size records (name, first entry, entry count)
+    entries   fixed size records (fixed [epoch:]version-release, ALAS id, severity), sorted by version within a
+              package
+    cves      sorted fixed size records (cve, first id, id count)
+    ids       string references to ALAS ids
+    strings   every distinct string once, utf-8
+Strings are referenced by (offset, length) into the strings section.
+"""
+
+IndexEntry = namedtuple("IndexEntry", ["version", "alas_id", "severity"])
+
+MAGIC = b"ALASIDX1"
+header_struct = struct.Struct("<8sIIIIIII")
+string_ref = struct.Struct("<IH")
+range_record = struct.Struct("<IHII")
+entry_record = struct.Struct("<IHIHIH")
+
+
+class IndexBuilder:
+    """collects fixes and cves from Summary objects and writes the index file"""
+
+    def __init__(self):
+        self.packages: Dict[str, set] = defaultdict(set)
+        self.cves: Dict[str, set] = defaultdict(set)
+
+    def add(self, summary):
+        for fix in summary.fixes or []:
+            # fix.ver is only version-release, the epoch comes from the package name when the advisory lists one
+            parsed = nevra.split(fix.pkg)
+            self.packages[parsed.name].add(IndexEntry(parsed.evr, summary.id, summary.sev or ""))
+        for cve in summary.cves or []:
+            self.cves[cve].add(summary.id)
+
+    async def add_all(self, summaries: AsyncIterable) -> "IndexBuilder":
+        """add everything a driver's items() yields, records without fixes (deletions) are skipped"""
+        async for summary in summaries:
+            if getattr(summary, "fixes", None) is not None:
+                self.add(summary)
+        return self
+
+    def write(self, path: Path):
+        strings = bytearray()
+        offsets = {}
+
+        def ref(value: str):
+            if value not in offsets:
+                encoded = value.encode()
+                offsets[value] = (len(strings), len(encoded))
+                strings.extend(encoded)
+            return offsets[value]
+
+        packages, entries, cves, ids = bytearray(), bytearray(), bytearray(), bytearray()
+        entry_count = 0
+        for name in sorted(self.packages, key=str.encode):
+            package_entries = sorted(self.packages[name], key=lambda e: (evr_key(e.version), e.alas_id))
+            packages += range_record.pack(*ref(name), entry_count, len(package_entries))
+            for entry in package_entries:
+                entries += entry_record.pack(*ref(entry.version), *ref(entry.alas_id), *ref(entry.severity))
+            entry_count += len(package_entries)
+
+        id_count = 0
+        for cve in sorted(self.cves, key=str.encode):
+            alas_ids = sorted(self.cves[cve])
+            cves += range_record.pack(*ref(cve), id_count, len(alas_ids))
+            for alas_id in alas_ids:
+                ids += string_ref.pack(*ref(alas_id))
+            id_count += len(alas_ids)
+
+        entries_offset = header_struct.size + len(packages)
+        cves_offset = entries_offset + len(entries)
+        ids_offset = cves_offset + len(cves)
+        strings_offset = ids_offset + len(ids)
+        header = header_struct.pack(
+            MAGIC,
+            len(self.packages),
+            len(self.cves),
+            header_struct.size,
+            entries_offset,
+            cves_offset,
+            ids_offset,
+            strings_offset,
+        )
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as fp:
+            for section in (header, packages, entries, cves, ids, strings):
+                fp.write(section)
+        tmp_path.replace(path)
+
+
+class AdvisoryIndex:
+    """
+    Read only view over an index file, usable as a context manager:
+
+    with AdvisoryIndex(path) as index:
+        index.affected("openssl", "1:1.0.2k-19.amzn2.0.1")
+    """
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as fp:
+            self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            self.package_count,
+            self.cve_count,
+            self._packages_offset,
+            self._entries_offset,
+            self._cves_offset,
+            self._ids_offset,
+            self._strings_offset,
+        ) = header_struct.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError("Invalid advisory index: {}".format(path))
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_offset + offset
+        return self._mm[start : start + length].decode()
+
+    def _find(self, section_offset: int, count: int, name: str):
+        """binary search of a sorted range record section, returns (first, count) or None"""
+        target = name.encode()
+        low, high = 0, count
+        while low < high:
+            mid = (low + high) // 2
+            offset, length, first, size = range_record.unpack_from(
+                self._mm, section_offset + mid * range_record.size
+            )
+            start = self._strings_offset + offset
+            value = self._mm[start : start + length]
+            if value < target:
+                low = mid + 1
+            elif value > target:
+                high = mid
+            else:
+                return first, size
+        return None
+
+    def _entry(self, i: int) -> IndexEntry:
+        version_ref, version_len, id_ref, id_len, sev_ref, sev_len = entry_record.unpack_from(
+            self._mm, self._entries_offset + i * entry_record.size
+        )
+        return IndexEntry(
+            self._string(version_ref, version_len),
+            self._string(id_ref, id_len),
+            self._string(sev_ref, sev_len),
+        )
+
+    def _entry_version(self, i: int) -> str:
+        return self._string(*string_ref.unpack_from(self._mm, self._entries_offset + i * entry_record.size))
+
+    def lookup(self, package: str) -> List[IndexEntry]:
+        """every fix of a package, oldest fixed version first"""
+        found = self._find(self._packages_offset, self.package_count, package)
+        if not found:
+            return []
+        first, size = found
+        return [self._entry(i) for i in range(first, first + size)]
+
+    def _first_newer(self, low: int, high: int, installed_key: tuple) -> int:
+        """binary search on the sorted versions of entries low to high: the first one newer than installed_key"""
+        while low < high:
+            mid = (low + high) // 2
+            if installed_key < evr_key(self._entry_version(mid)):
+                high = mid
+            else:
+                low = mid + 1
+        return low
+
+    def affected(self, package: str, installed_evr: str) -> List[IndexEntry]:
+        """
+        the fixes newer than the installed version, i.e. the advisories the installed package is vulnerable to
+
+        Most advisories list their fixed packages without an epoch: those fixes are compared with the installed
+        version without its epoch, the fixes that carry an epoch with the full installed version.
+        """
+        found = self._find(self._packages_offset, self.package_count, package)
+        if not found:
+            return []
+        first, size = found
+        end = first + size
+        # entries without an epoch sort before the ones with an epoch (>= 1), find where the latter start
+        low, high = first, end
+        while low < high:
+            mid = (low + high) // 2
+            if ":" in self._entry_version(mid):
+                high = mid
+            else:
+                low = mid + 1
+        with_epoch = low
+        _, colon, unprefixed = installed_evr.partition(":")
+        # only the affected entries are decoded
+        return [
+            self._entry(i)
+            for start, stop, installed in (
+                (first, with_epoch, unprefixed if colon else installed_evr),
+                (with_epoch, end, installed_evr),
+            )
+            for i in range(self._first_newer(start, stop, evr_key(installed)), stop)
+        ]
+
+    def advisories_for_cve(self, cve: str) -> List[str]:
+        found = self._find(self._cves_offset, self.cve_count, cve)
+        if not found:
+            return []
+        first, size = found
+        return [
+            self._string(*string_ref.unpack_from(self._mm, self._ids_offset + i * string_ref.size))
+            for i in range(first, first + size)
+        ]
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
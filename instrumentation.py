@@ -0,0 +1,208 @@
+import cProfile
+import functools
+import inspect
+import json
+import time
+from pathlib import Path
+from typing import Dict, List
+
+"""
+Low overhead timing of the driver's hot path: perf_counter_ns spans aggregated into histograms, reported once as
+json instead of printed per item, and a profiling decorator that understands coroutines and async generators
+"""
+
+
+def nearest_rank(ordered: List[int], p: float) -> int:
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1, max(0, -(-len(ordered) * p // 100) - 1))]
+
+
+class Histogram:
+    """raw span durations in nanoseconds, percentiles are computed when reported"""
+
+    __slots__ = ("values", "total")
+
+    def __init__(self):
+        self.values: List[int] = []
+        self.total = 0
+
+    def add(self, value: int):
+        self.values.append(value)
+        self.total += value
+
+    def percentile(self, p: float) -> int:
+        return nearest_rank(sorted(self.values), p)
+
+    def to_dict(self) -> dict:
+        """count and totals, durations in milliseconds"""
+        count = len(self.values)
+        ordered = sorted(self.values)
+        return {
+            "count": count,
+            "sum_ms": self.total / 1e6,
+            "mean_ms": self.total / count / 1e6 if count else 0.0,
+            "p50_ms": nearest_rank(ordered, 50) / 1e6,
+            "p95_ms": nearest_rank(ordered, 95) / 1e6,
+            "p99_ms": nearest_rank(ordered, 99) / 1e6,
+            "max_ms": nearest_rank(ordered, 100) / 1e6,
+        }
+
+
+class Span:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.add(time.perf_counter_ns() - self.start)
+
+
+class Instrumentation:
+    """
+    Named histograms of span durations:
+
+    instrumentation = Instrumentation()
+    with instrumentation.span("download"):
+        html = await download(url)
+    instrumentation.write_report(path)
+
+    A span around an await measures the wall time of the await, including time other tasks ran in the meantime.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def span(self, name: str) -> Span:
+        return Span(self.histogram(name))
+
+    def timed(self, name: str):
+        """decorator recording every call of a function or coroutine function as a span"""
+
+        def decorator(func):
+            histogram = self.histogram(name)
+            if inspect.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    with Span(histogram):
+                        return await func(*args, **kwargs)
+
+            else:
+
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    with Span(histogram):
+                        return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def report(self) -> Dict[str, dict]:
+        return {name: histogram.to_dict() for name, histogram in self.histograms.items()}
+
+    def write_report(self, path: Path, **extra):
+        """the report as json, with any extra sections (e.g. stages=pipeline.report()) next to the spans"""
+        with open(path, "w") as fp:
+            json.dump({"spans": self.report(), **extra}, fp, indent=2)
+
+
+def print_stats(pr: cProfile.Profile, sort: str, limit: int):
+    # only needed once a profiled function returns, not worth its import time for every importer of profile
+    import pstats
+
+    print("\n<<<---")
+    pstats.Stats(pr).strip_dirs().sort_stats(sort).print_stats(limit)
+    print("\n--->>>")
+
+
+def profile(func=None, *, sort: str = "cumtime", limit: int = 20):
+    """
+    cProfile a function and print its top calls when it returns. Coroutines are profiled until they complete and
+    async generators (and generators) until they are exhausted or closed, with the profiler paused while the consumer
+    holds a yielded item. While a coroutine awaits, whatever else the event loop runs is profiled too.
+
+    @profile
+    async def items():
+        ...
+    """
+    if func is None:
+        return functools.partial(profile, sort=sort, limit=limit)
+
+    if inspect.isasyncgenfunction(func):
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            pr = cProfile.Profile()
+            agen = func(*args, **kwargs)
+            try:
+                while True:
+                    pr.enable()
+                    try:
+                        item = await agen.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        pr.disable()
+                    yield item
+            finally:
+                await agen.aclose()
+                print_stats(pr, sort, limit)
+
+    elif inspect.isgeneratorfunction(func):
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            pr = cProfile.Profile()
+            gen = func(*args, **kwargs)
+            try:
+                while True:
+                    pr.enable()
+                    try:
+                        item = next(gen)
+                    except StopIteration:
+                        break
+                    finally:
+                        pr.disable()
+                    yield item
+            finally:
+                gen.close()
+                print_stats(pr, sort, limit)
+
+    elif inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            pr = cProfile.Profile()
+            pr.enable()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                pr.disable()
+                print_stats(pr, sort, limit)
+
+    else:
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            pr = cProfile.Profile()
+            pr.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                pr.disable()
+                print_stats(pr, sort, limit)
+
+    return wrapper
@@ -1,16 +1,29 @@
-from parsers import OneParser, AnotherParser
+import asyncio
+import time
+from collections import Counter
+from pathlib import Path
+
+from orchestrator import Orchestrator
+
+workspace = Path("/tmp/feeds")
+
+
+async def sync():
+    counts = Counter()
+    async with Orchestrator(workspace) as orchestrator:
+        async for name, _ in orchestrator.run():
+            counts[name] += 1
+    for name in sorted(orchestrator.parsers):
+        print(f"{name}: {counts[name]} records")
+    for name, err in orchestrator.errors.items():
+        print(f"{name} failed: {err}")
 
 
 def main():
     print("Welcome!")
-    url1 = "https://someurl.com/"
-    url2 = "https://anourl.com/"
-
-    parser1 = OneParser()
-    parser2 = AnotherParser()
-    # parse into pydantic model
-    # save to database
-    # print something
+    start_time = time.perf_counter()
+    asyncio.run(sync())
+    print("--- %s seconds ---" % (time.perf_counter() - start_time))
 
 
 if __name__ == '__main__':
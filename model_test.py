@@ -1,68 +1,91 @@
+import argparse
 import time
 
-from decorators import profile
-from models import PVulnerability, PFixedIn, Vulnerability, FixedIn, JsonifierMixin
-
-model_data = {
-    'Name': "The Name",
-    'NamespaceName': "The Namespace Name",
-    'Description': "this is my description",
-    'Severity': 'Medium',
-    'Metadata': {'CVE': ['CVE-555-1212']},
-    'Link': 'https://supersecurity.io/supercereal',
-    'FixedIn': [
-        {
-            'Name': "The Fixedin Name",
-            'NamespaceName': "The FixedIn Namespace Name",
-            'VersionFormat': 'rpm',
-            'Version': '1.0.0',
+import ujson
 
-        }
-    ]
-}
+from decorators import profile
+from models import PVulnerability, Vulnerability, FixedIn, SVulnerability, dumps_many
 
+"""
+Build and serialize the same records with the three model backends: pydantic, the legacy JsonifierMixin classes
+and the slots classes
+"""
 
-@profile
-def pydantic_main():
-    v = PVulnerability(**model_data)
-    print(v.json())
 
+def make_records(count):
+    return [
+        {
+            'Name': f"ALAS2-2021-{i:04}",
+            'NamespaceName': "amzn:2",
+            'Description': "this is my description",
+            'Severity': ['Low', 'Medium', 'High', 'Critical'][i % 4],
+            'Metadata': {'CVE': [f'CVE-2021-{i:05}']},
+            'Link': f'https://alas.aws.amazon.com/AL2/ALAS2-2021-{i:04}.html',
+            'FixedIn': [
+                {
+                    'Name': f"package{i % 97}{suffix}",
+                    'NamespaceName': "amzn:2",
+                    'VersionFormat': 'rpm',
+                    'Version': f'1.{i % 13}.{i}-1.amzn2',
+                }
+                for suffix in ("", "-devel", "-libs")
+            ]
+        }
+        for i in range(count)
+    ]
 
-@profile
-def legacy_main():
-    v = Vulnerability()
-    v.Name = model_data['Name'],
-    v.NamespaceName = model_data['NamespaceName'],
-    v.Description = model_data['Description'],
-    v.Severity = model_data['Severity'],
-    v.Metadata = model_data['Metadata'],
-    v.Link = model_data['Link']
 
-    fi = FixedIn()
-    fi.Name = model_data['FixedIn'][0]['Name']
-    fi.NamespaceName = model_data['FixedIn'][0]['NamespaceName']
-    fi.VersionFormat = model_data['FixedIn'][0]['VersionFormat']
-    fi.Version = model_data['FixedIn'][0]['Version']
+def pydantic_main(records):
+    return "[" + ",".join(PVulnerability(**data).json() for data in records) + "]"
 
-    v.FixedIn.append(fi)
 
-    print(v.json())
+def legacy_main(records):
+    vulnerabilities = []
+    for data in records:
+        v = Vulnerability()
+        v.Name = data['Name']
+        v.NamespaceName = data['NamespaceName']
+        v.Description = data['Description']
+        v.Severity = data['Severity']
+        v.Metadata = data['Metadata']
+        v.Link = data['Link']
 
+        for fix in data['FixedIn']:
+            fi = FixedIn()
+            fi.Name = fix['Name']
+            fi.NamespaceName = fix['NamespaceName']
+            fi.VersionFormat = fix['VersionFormat']
+            fi.Version = fix['Version']
+            v.FixedIn.append(fi)
 
-if __name__ == '__main__':
-    start_time = time.time()
-    legacy_main()
-    legacy_time = time.time() - start_time
+        vulnerabilities.append(v.json())
+    return ujson.dumps(vulnerabilities)
 
 
-    p_start_time = time.time()
-    pydantic_main()
-    p_time = time.time() - p_start_time
+def slots_main(records):
+    return dumps_many([SVulnerability.from_dict(data) for data in records])
 
-    print(f"Legacy --- {legacy_time} seconds ---")
-    print(f"Pydantic --- {p_time} seconds ---")
 
-    print("Legacy is faster: %s" % (legacy_time < p_time))
-    print("Pydantic is faster: %s" % (p_time < legacy_time))
+def run(name, func, records):
+    start_time = time.perf_counter()
+    output = func(records)
+    elapsed = time.perf_counter() - start_time
+    print(f"{name:<9} --- {elapsed:.3f} seconds ({len(records) / elapsed:.0f} records/s) ---")
+    return elapsed, ujson.loads(output)
 
 
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--count", type=int, default=10000)
+    arg_parser.add_argument("--profile", action="store_true")
+    args = arg_parser.parse_args()
+
+    records = make_records(args.count)
+    backends = [("Pydantic", pydantic_main), ("Legacy", legacy_main), ("Slots", slots_main)]
+    results = {}
+    for name, func in backends:
+        results[name] = run(name, profile(func) if args.profile else func, records)
+
+    outputs = [output for _, output in results.values()]
+    print("Same json from all backends: %s" % all(output == outputs[0] for output in outputs))
+    print("Fastest: %s" % min(results, key=lambda name: results[name][0]))
@@ -1,7 +1,9 @@
 from pydantic import BaseModel
-from typing import List, Any, Dict, Optional
+from typing import Iterable, List, Any, Dict, Optional
 import ujson
 
+from versions import NO_FIX, evr_key
+
 
 class AnchoreBaseModel(BaseModel):
 
@@ -35,6 +37,11 @@ class PFixedIn(AnchoreBaseModel):
     VersionFormat: str
     Version: str
 
+    @property
+    def version_key(self) -> tuple:
+        """sort key of Version (see versions.evr_key), computed once per distinct version"""
+        return evr_key(self.Version or NO_FIX)
+
 
 # original models from amazon driver
 # -----------------------------------------
@@ -90,4 +97,109 @@ class FixedIn(JsonifierMixin):
         self.VersionFormat = None
         self.Version = None
 
+    @property
+    def version_key(self) -> tuple:
+        """sort key of Version (see versions.evr_key), computed once per distinct version"""
+        return evr_key(self.Version or NO_FIX)
+
+# ----------------------------------------
+
+
+# slots based models, same json as the two above
+# -----------------------------------------
+class SlotsRecord(object):
+    """
+    Base of the __slots__ models. fields lists the attributes in output order and is compiled once per class into
+    a to_dict made of a single dict literal, the way dataclasses generates its methods, so serializing never walks
+    vars() or probes values with hasattr like JsonifierMixin does. The fields named in nested hold lists of records.
+    """
+
+    __slots__ = ()
+    fields = ()
+    nested = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        items = ", ".join(
+            f"{field!r}: [x.to_dict() for x in self.{field}]" if field in cls.nested else f"{field!r}: self.{field}"
+            for field in cls.fields
+        )
+        namespace = {}
+        exec(f"def to_dict(self):\n    return {{{items}}}", namespace)
+        cls.to_dict = namespace["to_dict"]
+
+    def to_dict(self) -> dict:
+        return {}
+
+    def json(self) -> str:
+        return ujson.dumps(self.to_dict())
+
+
+class SFixedIn(SlotsRecord):
+    """
+    Class representing a fix record for return back to the service from the driver. The semantics of the version are:
+    "None" -> Package is vulnerable and no fix available yet
+    ! "None" -> Version of package with a fix for a vulnerability. Assume all older versions of the package are vulnerable.
+    """
+
+    fields = ("Name", "NamespaceName", "VersionFormat", "Version")
+    __slots__ = fields
+
+    def __init__(self, Name: str, NamespaceName: str, VersionFormat: str, Version: str):
+        self.Name = Name
+        self.NamespaceName = NamespaceName
+        self.VersionFormat = VersionFormat
+        self.Version = Version
+
+    @property
+    def version_key(self) -> tuple:
+        """sort key of Version (see versions.evr_key), computed once per distinct version"""
+        return evr_key(self.Version or NO_FIX)
+
+
+class SVulnerability(SlotsRecord):
+    """
+    Class representing the record to be returned. Uses strange capitalization
+    to be backwards compatible in the json output with previous version of feed data.
+    """
+
+    fields = ("Name", "NamespaceName", "Description", "Severity", "Metadata", "Link", "FixedIn")
+    nested = ("FixedIn",)
+    __slots__ = fields
+
+    def __init__(
+        self,
+        Name: str,
+        NamespaceName: str,
+        Description: str,
+        Severity: str,
+        Metadata: Dict = None,
+        Link: str = None,
+        FixedIn: Optional[List[SFixedIn]] = None,
+    ):
+        self.Name = Name
+        self.NamespaceName = NamespaceName
+        self.Description = Description
+        self.Severity = Severity
+        self.Metadata = Metadata
+        self.Link = Link
+        self.FixedIn = FixedIn if FixedIn is not None else []
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SVulnerability":
+        return cls(
+            data["Name"],
+            data["NamespaceName"],
+            data["Description"],
+            data["Severity"],
+            data.get("Metadata"),
+            data.get("Link"),
+            [SFixedIn(**fix) for fix in data.get("FixedIn") or []],
+        )
+
+
+def dumps_many(records: Iterable[SlotsRecord]) -> str:
+    """serialize a batch of records into one json array with a single ujson call"""
+    return ujson.dumps([record.to_dict() for record in records])
+
 # ----------------------------------------
@@ -0,0 +1,145 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional
+
+from instrumentation import Histogram
+from pipeline import Stage
+
+"""
+Event loop lag and blocking call detection. A heartbeat task measures how late the loop wakes it up, and a watchdog
+thread captures the loop thread's stack while the heartbeat is overdue, so a synchronous call holding the loop is
+reported with where it was. Neither relies on asyncio debug mode, so it works the same on uvloop.
+"""
+
+
+class BlockedCall:
+    __slots__ = ("duration", "stage", "stack")
+
+    def __init__(self, duration: float, stage: Optional[str], stack: Optional[List[str]]):
+        self.duration = duration
+        self.stage = stage
+        self.stack = stack
+
+    def to_dict(self) -> dict:
+        return {
+            "duration_ms": self.duration * 1000,
+            "stage": self.stage,
+            "stack": self.stack,
+        }
+
+
+def stage_of(frame) -> Optional[str]:
+    """name of the pipeline Stage whose worker is running in the stack of frame, if any"""
+    while frame is not None:
+        if frame.f_code is Stage._call.__code__:
+            return frame.f_locals["self"].name
+        frame = frame.f_back
+    return None
+
+
+class LoopMonitor:
+    """
+    Monitor of the running event loop:
+
+    async with LoopMonitor(threshold=0.1) as monitor:
+        ...
+    monitor.report()
+
+    - interval: seconds between heartbeats, the lag histogram has one value per heartbeat
+    - threshold: loop lag from which the loop counts as blocked; the stack is captured once per blocked period and
+      the blocked time is attributed to the pipeline stage on that stack
+    """
+
+    def __init__(self, interval: float = 0.01, threshold: float = 0.1, stack_limit: int = 15, max_blocked: int = 100):
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_limit = stack_limit
+        self.max_blocked = max_blocked
+        self.lag = Histogram()
+        self.blocked: List[BlockedCall] = []
+        self.blocked_count = 0
+        self.blocked_by_stage: Dict[str, float] = {}
+        self._beat = 0.0
+        self._captured_beat = None
+        self._pending = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._heartbeat_task = None
+        self._watchdog = None
+        self._loop_thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._heartbeat_task is not None
+
+    async def _heartbeat(self):
+        self._beat = time.perf_counter()
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - self._beat - self.interval)
+            self._beat = now
+            self.lag.add(int(lag * 1e9))
+            if lag >= self.threshold:
+                with self._lock:
+                    pending, self._pending = self._pending, None
+                self._record(lag, *(pending or (None, None)))
+
+    def _record(self, lag: float, stage: Optional[str], stack: Optional[List[str]]):
+        self.blocked_count += 1
+        key = stage or "unknown"
+        self.blocked_by_stage[key] = self.blocked_by_stage.get(key, 0.0) + lag
+        if len(self.blocked) < self.max_blocked:
+            self.blocked.append(BlockedCall(lag, stage, stack))
+
+    def _watch(self):
+        while not self._stopped.wait(self.threshold / 4):
+            beat = self._beat
+            if time.perf_counter() - beat - self.interval < self.threshold or beat == self._captured_beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            self._captured_beat = beat
+            pending = (stage_of(frame), traceback.format_stack(frame, limit=self.stack_limit))
+            with self._lock:
+                self._pending = pending
+
+    async def start(self) -> "LoopMonitor":
+        """start monitoring the running loop, does nothing when already started"""
+        if self._heartbeat_task is None:
+            self._loop_thread = threading.get_ident()
+            self._beat = time.perf_counter()
+            self._stopped.clear()
+            self._heartbeat_task = asyncio.ensure_future(self._heartbeat())
+            self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+            self._watchdog.start()
+        return self
+
+    async def stop(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+            self._stopped.set()
+            await asyncio.to_thread(self._watchdog.join)
+
+    def report(self) -> dict:
+        return {
+            "lag": self.lag.to_dict(),
+            "blocked_count": self.blocked_count,
+            "blocked_by_stage_ms": {stage: total * 1000 for stage, total in self.blocked_by_stage.items()},
+            "blocked": [call.to_dict() for call in self.blocked],
+        }
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
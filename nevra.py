@@ -0,0 +1,64 @@
+from collections import namedtuple
+from functools import lru_cache
+from typing import Iterable, List
+
+"""
+Fast rpm filename (NEVRA) parsing, memoized for the filenames that repeat across feeds
+"""
+
+cache_size = 1 << 16
+
+
+class Nevra(namedtuple("Nevra", ["name", "version", "release", "epoch", "arch"])):
+    """
+    Components of an rpm filename, in the same order utils.split_rpm_filename returns them. Instances are shared
+    through the parse cache, being a tuple they are immutable.
+    """
+
+    __slots__ = ()
+
+    @property
+    def version_release(self) -> str:
+        return f"{self.version}-{self.release}" if self.release else self.version
+
+    @property
+    def evr(self) -> str:
+        """[epoch:]version-release, without the epoch when there is none or it is 0"""
+        return f"{self.epoch}:{self.version_release}" if self.epoch and self.epoch != "0" else self.version_release
+
+
+_new = tuple.__new__
+
+
+def parse(rpm_filename: str) -> Nevra:
+    """
+    Uncached parse of an rpm filename, same results as utils.split_rpm_filename:
+    foo-1.0-1.x86_64.rpm -> foo, 1.0, 1, '', x86_64
+    1:bar-9-123a.ia64.rpm -> bar, 9, 123a, 1, ia64
+    :raises ValueError: when the filename has no arch or no version-release
+    """
+    base, rpm, _ = rpm_filename.rpartition(".rpm")
+    if not rpm:
+        base = rpm_filename
+    rest, dot, arch = base.rpartition(".")
+    if dot:
+        components = rest.rsplit("-", 2)
+        # tuple.__new__ skips the python level namedtuple constructor
+        if len(components) == 3:
+            name, version, release = components
+            epoch, colon, unprefixed = name.partition(":")
+            if colon:
+                return _new(Nevra, (unprefixed, version, release, epoch, arch))
+            return _new(Nevra, (name, version, release, "", arch))
+        if len(components) == 2:
+            return _new(Nevra, (None, components[0], components[1], None, arch))
+    raise ValueError("Invalid rpm filename: {}".format(rpm_filename))
+
+
+split = lru_cache(maxsize=cache_size)(parse)
+split.__doc__ = "memoized parse, bounded to the cache_size most recently used filenames"
+
+
+def split_many(rpm_filenames: Iterable[str]) -> List[Nevra]:
+    """parse a batch of rpm filenames through the shared cache"""
+    return list(map(split, rpm_filenames))
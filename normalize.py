@@ -0,0 +1,35 @@
+import re
+import sys
+from typing import Iterable, List, Optional
+
+"""
+Normalization of the advisory fields repeated across a dataset: severities are mapped through a precomputed table,
+and CVE ids and package names are validated and interned, so every record shares one copy of each string
+"""
+
+# ALAS severities -> the severities of the normalized records, the normalized names map to themselves
+severity_map = {
+    "low": "Low",
+    "medium": "Medium",
+    "important": "High",
+    "critical": "Critical",
+}
+severity_table = {**severity_map, **{value.lower(): value for value in severity_map.values()}}
+
+UNKNOWN_SEVERITY = "Unknown"
+
+cve_pattern = re.compile(r"CVE-\d{4}-\d{4,}")
+
+intern = sys.intern
+
+
+def normalize_severity(sev: Optional[str]) -> str:
+    """'important' -> 'High', anything not in the table -> 'Unknown'"""
+    if not sev:
+        return UNKNOWN_SEVERITY
+    return severity_table.get(sev.lower(), UNKNOWN_SEVERITY)
+
+
+def normalize_cves(cves: Iterable[str]) -> List[str]:
+    """the valid CVE ids, interned, without duplicates"""
+    return [intern(cve) for cve in dict.fromkeys(cve.strip() for cve in cves) if cve_pattern.fullmatch(cve)]
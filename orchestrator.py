@@ -0,0 +1,120 @@
+import asyncio
+from pathlib import Path
+from typing import AsyncGenerator, Dict, Iterable, Optional, Tuple
+
+from client import PooledClient
+from parsers import ParserBase, load_parsers
+from retry import CircuitBreaker, RetryPolicy
+from scheduler import Scheduler
+
+"""
+Runs every registered feed concurrently on shared resources, so a full sync takes about as long as its largest feed
+instead of the sum of all of them
+"""
+
+
+class Orchestrator:
+    """
+    One PooledClient, fetch Scheduler and RetryPolicy shared by every feed:
+
+    async with Orchestrator(workspace) as orchestrator:
+        async for name, record in orchestrator.run():
+            ...
+
+    - names: registry names of the feeds to run, every registered feed by default
+    - budget: advisories fetched at the same time across all feeds, also the size of the connection pool
+    - workers: fetch workers of each feed, at most budget of them are busy at once
+    - max_per_host: connections to a single host across all feeds, the whole budget by default as the feeds of a
+      distro usually live on the same host
+    - urls: feed name -> url replacing the feed's default url
+    - options: passed on to every feed, e.g. parse_workers or a sink
+    A feed that fails is recorded in errors and does not stop the others.
+    """
+
+    def __init__(
+        self,
+        workspace: Path,
+        names: Optional[Iterable[str]] = None,
+        budget: int = 40,
+        workers: int = 20,
+        max_per_host: Optional[int] = None,
+        urls: Optional[Dict[str, str]] = None,
+        **options,
+    ):
+        parsers = load_parsers()
+        names = sorted(parsers) if names is None else list(names)
+        urls = urls or {}
+        for name in names:
+            if name not in parsers:
+                raise ValueError("Unknown feed: {}".format(name))
+
+        self.budget = budget
+        # room for the feed downloads next to the budget, in pools of about 10 connections (see PooledClient)
+        connections = budget + len(names)
+        self.client = PooledClient(
+            max_connections=connections,
+            max_connections_per_host=max_per_host + len(names) if max_per_host else connections,
+            max_keepalive_connections=connections,
+            shards=-(-connections // 10),
+        )
+        self.scheduler = Scheduler(workers=workers, budget=budget)
+        # one breaker for everything, it throttles the scheduler all the feeds share
+        self.retry_policy = RetryPolicy(breaker=CircuitBreaker(scheduler=self.scheduler))
+        self.parsers: Dict[str, ParserBase] = {
+            name: parsers[name](
+                workspace,
+                urls.get(name),
+                client=self.client,
+                scheduler=self.scheduler,
+                retry_policy=self.retry_policy,
+                **options,
+            )
+            for name in names
+        }
+        self.errors: Dict[str, Exception] = {}
+
+    async def _drain(self, name: str, parser: ParserBase, queue: asyncio.Queue):
+        try:
+            async for record in parser.parse():
+                await queue.put((name, record))
+        except Exception as err:
+            self.errors[name] = err
+            print(f"{name}: {err}")
+        finally:
+            await queue.put(None)
+
+    async def run(self) -> AsyncGenerator[Tuple[str, object], None]:
+        """yield (feed name, record) for the records of every feed, in the order they complete"""
+        queue = asyncio.Queue(maxsize=self.budget)
+        tasks = [
+            asyncio.create_task(self._drain(name, parser, queue)) for name, parser in self.parsers.items()
+        ]
+        try:
+            running = len(tasks)
+            while running:
+                entry = await queue.get()
+                if entry is None:
+                    running -= 1
+                else:
+                    yield entry
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def report(self) -> dict:
+        return {
+            "feeds": {name: parser.report() for name, parser in self.parsers.items()},
+            "errors": {name: str(err) for name, err in self.errors.items()},
+            "retry": self.retry_policy.report(),
+        }
+
+    async def close(self):
+        if not self.client.is_closed:
+            await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -1,30 +1,61 @@
 import abc
+import importlib
+from pathlib import Path
+from typing import AsyncGenerator, Dict, Type
 
+"""
+Registry of the feed sources. Every feed implements ParserBase under a unique name and registers itself when its
+module is imported; driver_modules lists the modules holding feeds, imported on first use of load_parsers().
+"""
 
-class ParserBase(abc.ABC):
+driver_modules = ["amazon3"]
 
-    @abc.abstractmethod
-    def get_url(self, url: str = None):
-        pass
+registry: Dict[str, Type["ParserBase"]] = {}
 
-    @abc.abstractmethod
-    def parse(self):
-        pass
 
+class ParserBase(abc.ABC):
+    """
+    One feed source:
 
-class OneParser(ParserBase):
+    - name: unique key in the registry, e.g. "amzn:2"; subclasses without a name are not registered
+    - url: default url of the feed, replaced by the url given to the constructor (e.g. a mirror or a stub server)
+    - get_url(): the url of the feed
+    - parse(): async generator of the feed's records
 
-    def get_url(self, url: str = None):
-        pass
+    options are the shared resources and settings handed to every feed by the orchestrator (client, scheduler...)
+    """
 
-    def parse(self):
-        pass
+    name: str = None
+    url: str = None
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.name is not None:
+            if cls.name in registry and registry[cls.name] is not cls:
+                raise ValueError("Duplicate feed name: {}".format(cls.name))
+            registry[cls.name] = cls
 
-class AnotherParser(ParserBase):
+    def __init__(self, workspace: Path, url: str = None, **options):
+        self.workspace = workspace
+        if url is not None:
+            self.url = url
+        self.options = options
 
+    @abc.abstractmethod
     def get_url(self, url: str = None):
         pass
 
-    def parse(self):
+    @abc.abstractmethod
+    def parse(self) -> AsyncGenerator:
         pass
+
+    def report(self) -> dict:
+        """machine readable report of the last parse()"""
+        return {}
+
+
+def load_parsers() -> Dict[str, Type[ParserBase]]:
+    """import the driver modules so every feed is registered, and return the registry"""
+    for module in driver_modules:
+        importlib.import_module(module)
+    return registry
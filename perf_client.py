@@ -0,0 +1,62 @@
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from client import PooledClient
+from stub_server import StubServer, build_feed
+from utils import download_remote_file
+
+"""
+Compare one new httpx client per download against the shared PooledClient, against a local stub server
+"""
+
+
+async def per_call_client(urls, workspace: Path):
+    await asyncio.gather(
+        *[download_remote_file(url, workspace / str(i)) for i, url in enumerate(urls)]
+    )
+
+
+async def pooled_client(urls, workspace: Path, **client_options):
+    async with PooledClient(**client_options) as client:
+        await asyncio.gather(
+            *[
+                download_remote_file(url, workspace / str(i), client=client)
+                for i, url in enumerate(urls)
+            ]
+        )
+
+
+def run(name, server, coro):
+    server.connection_count = 0
+    start_time = time.perf_counter()
+    asyncio.run(coro)
+    elapsed = time.perf_counter() - start_time
+    print(
+        f"{name:<22}: {elapsed:.2f} seconds, {server.connection_count} connections"
+    )
+    return elapsed
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--count", type=int, default=739)
+    arg_parser.add_argument("--latency", type=float, default=0.0)
+    args = arg_parser.parse_args()
+
+    with StubServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        server.routes.update(build_feed(args.count, server.url))
+        urls = [server.url + path for path in server.routes]
+        workspace = Path(tmp)
+
+        per_call_time = run("Per call client", server, per_call_client(urls, workspace))
+        pooled_time = run("Pooled client", server, pooled_client(urls, workspace))
+        pooled_host_time = run(
+            "Pooled client (10/host)",
+            server,
+            pooled_client(urls, workspace, max_connections_per_host=10),
+        )
+
+    print(f"Pooled is faster: {pooled_time < per_call_time}")
@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import contextlib
+import importlib
+import io
+import re
+import resource
+import statistics
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from feed import parse_items
+from stub_server import StubServer, build_feed, load_recording
+
+"""
+Run the three feed drivers (amazon, amazon2 and amazon3.AmazonFeedDriver) against the same replayed feed served by
+the local stub server, with configurable latency, jitter and error rate, and report throughput, per advisory
+latency and peak RSS.
+
+The feed is either generated (--count) or replayed from a BlobStore recorded by a live AmazonFeedDriver run
+(--recording). Each driver runs in its own process, next to its own stub server, so peak RSS is not shared between
+drivers. The latency of an advisory is measured from the first request of its page to the driver yielding it.
+"""
+
+legacy_id_pattern = re.compile(r"alas: (\S+)")
+
+
+async def amazon_ids(feed_url: str, workspace: Path):
+    import amazon
+
+    amazon.amazon_security_advisories = {"2": feed_url}
+    async for item in amazon.items():
+        yield legacy_id_pattern.search(item).group(1)
+
+
+async def amazon2_ids(feed_url: str, workspace: Path):
+    import amazon2
+
+    amazon2.amazon_security_advisories = {"2": feed_url}
+    async for item in amazon2.items():
+        yield item["alas"].id
+
+
+async def amazon3_ids(feed_url: str, workspace: Path):
+    import amazon3
+
+    amazon3.amazon_security_advisories = {"2": feed_url}
+    async with amazon3.AmazonFeedDriver(workspace) as afd:
+        async for summary in afd.items():
+            yield summary.id
+
+
+drivers = {
+    "amazon": amazon_ids,
+    "amazon2": amazon2_ids,
+    "amazon3": amazon3_ids,
+}
+
+
+async def consume(ids) -> dict:
+    done = {}
+    async for alas_id in ids:
+        done[alas_id] = time.time()
+    return done
+
+
+def run_driver(name: str, options: dict) -> dict:
+    """one benchmark run, in a fresh process"""
+    with StubServer(
+        latency=options["latency"],
+        jitter=options["jitter"],
+        error_rate=options["error_rate"],
+        feed_error_rate=options["feed_error_rate"],
+    ) as server, tempfile.TemporaryDirectory() as tmp:
+        if options["recording"]:
+            server.routes.update(load_recording(Path(options["recording"]), server.url, options["origin"]))
+        else:
+            server.routes.update(build_feed(options["count"], server.url))
+        feed_path = next(path for path in server.routes if path.endswith(".rss"))
+        pages = {item["title"].split()[0]: urlsplit(item["link"]).path for item in parse_items(server.routes[feed_path])}
+        workspace = Path(tmp)
+        (workspace / "html").mkdir()
+        # imports are not part of the measured run
+        importlib.import_module(name)
+
+        start_time = time.perf_counter()
+        # the legacy drivers print every response status, a profile and parser warnings, keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            done = asyncio.run(consume(drivers[name](server.url + feed_path, workspace)))
+        elapsed = time.perf_counter() - start_time
+
+        latencies = sorted(
+            finished - server.request_times[pages[alas_id]]
+            for alas_id, finished in done.items()
+            if pages.get(alas_id) in server.request_times
+        )
+        return {
+            "driver": name,
+            "advisories": len(pages),
+            "processed": len(done),
+            "errors": server.error_count,
+            "requests": server.request_count,
+            "elapsed": elapsed,
+            "latencies": latencies,
+            # kilobytes on linux
+            "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+
+def percentile(values, p: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--drivers", nargs="+", choices=list(drivers), default=list(drivers))
+    arg_parser.add_argument("--count", type=int, default=200)
+    arg_parser.add_argument("--recording", default=None, help="BlobStore root recorded by AmazonFeedDriver(store=...)")
+    arg_parser.add_argument("--origin", default="https://alas.aws.amazon.com", help="host the recording was made from")
+    arg_parser.add_argument("--latency", type=float, default=0.02)
+    arg_parser.add_argument("--jitter", type=float, default=0.0)
+    arg_parser.add_argument("--error-rate", type=float, default=0.0)
+    arg_parser.add_argument("--feed-error-rate", type=float, default=0.0)
+    args = arg_parser.parse_args()
+
+    options = {
+        "count": args.count,
+        "recording": args.recording,
+        "origin": args.origin,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "feed_error_rate": args.feed_error_rate,
+    }
+    for name in args.drivers:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            result = executor.submit(run_driver, name, options).result()
+        latencies = result["latencies"]
+        print(
+            f"{name:<8} processed {result['processed']}/{result['advisories']} advisories "
+            f"({result['errors']} server errors) in {result['elapsed']:.2f} seconds "
+            f"({result['processed'] / result['elapsed']:.1f} advisories/s), "
+            f"latency p50 {percentile(latencies, 50) * 1000:.0f} ms p99 {percentile(latencies, 99) * 1000:.0f} ms, "
+            f"peak rss {result['peak_rss'] / 1024:.1f} MB"
+        )
@@ -0,0 +1,81 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from filters import FilterSpec, alas_id_key
+
+"""
+Time FilterSpec.match_item over the rss items of a generated feed, with the kernel and livepatch extras advisories
+(ALAS2KERNEL-5.10-2022-003) the AL2 feed lists next to the release ones
+"""
+
+severities = ("low", "medium", "important", "critical")
+
+
+def build_items(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    start = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    items = []
+    for i in range(count):
+        prefix = rng.choice(("ALAS2", "ALAS2", "ALAS2", "ALAS2KERNEL-5.10", "ALAS2LIVEPATCH"))
+        items.append(
+            {
+                "title": f"{prefix}-{2021 + i * 3 // count}-{i:03} ({rng.choice(severities)}): package{i % 200}",
+                "description": ", ".join(f"CVE-2021-{rng.randrange(40000)}" for _ in range(rng.randrange(1, 4))),
+                "pubDate": format_datetime(start + timedelta(hours=i)),
+            }
+        )
+    return items
+
+
+def check_ids():
+    """the extras ids end with the same year and number, and the range filters them like the release ones"""
+    assert alas_id_key("ALAS2KERNEL-5.10-2022-003") == (2022, 3)
+    assert alas_id_key("ALAS2LIVEPATCH-2021-042") == (2021, 42)
+    assert alas_id_key("ALAS2-2021-1234") == (2021, 1234)
+    assert alas_id_key("ALAS-unknown") is None
+
+    spec = FilterSpec(min_id="ALAS2-2022-001", max_id="ALAS2-2022-010")
+    assert spec.match_item({"title": "ALAS2KERNEL-5.10-2022-003 (important): kernel"})
+    assert not spec.match_item({"title": "ALAS2LIVEPATCH-2021-042 (important): kernel-livepatch"})
+    # an id the range cannot place is filtered out, not an error aborting the extract
+    assert not spec.match_item({"title": "ALAS-unknown (important): kernel"})
+
+
+def check_dates():
+    """naive bounds are taken as UTC instead of failing the comparison with the timezone aware pubDates"""
+    spec = FilterSpec(published_after=datetime(2021, 1, 2), published_before=datetime(2021, 1, 4))
+    assert spec.match_item({"title": "ALAS2-2021-001 (low): a", "pubDate": "Sun, 03 Jan 2021 00:00:00 GMT"})
+    assert not spec.match_item({"title": "ALAS2-2021-002 (low): b", "pubDate": "Fri, 01 Jan 2021 00:00:00 -0000"})
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--count", type=int, default=5000)
+    arg_parser.add_argument("--rounds", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    check_ids()
+    check_dates()
+    items = build_items(args.count)
+    specs = {
+        "severity": FilterSpec(severities=("important", "critical")),
+        "cve": FilterSpec(cves=[f"CVE-2021-{i}" for i in range(0, 40000, 7)]),
+        "id range": FilterSpec(min_id="ALAS2-2022-000", max_id="ALAS2-2022-999"),
+        "published": FilterSpec(
+            published_after=datetime(2021, 3, 1, tzinfo=timezone.utc),
+            published_before=datetime(2021, 6, 1, tzinfo=timezone.utc),
+        ),
+        "shard": FilterSpec(shard=(1, 4)),
+    }
+    for name, spec in specs.items():
+        start_time = time.perf_counter()
+        for _ in range(args.rounds):
+            matched = sum(1 for item in items if spec.match_item(item))
+        elapsed = time.perf_counter() - start_time
+        print(
+            f"{name:<10} {matched:5} / {len(items)} items matched, "
+            f"{elapsed / (args.rounds * len(items)) * 1e6:.2f} us per item"
+        )
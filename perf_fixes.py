@@ -0,0 +1,74 @@
+import argparse
+import re
+import time
+from pathlib import Path
+
+from selectolax.parser import HTMLParser as SHTMLParser
+
+from amazon3 import driver_workspace
+from fixes import extract_fixes
+from stub_server import build_feed
+
+"""
+Pages per second of the single pass fixes.extract_fixes against the previous three regex searches, over a corpus
+of saved ALAS pages (the html directory of a driver workspace) or generated pages when none are available
+"""
+
+
+def legacy_extract_fixes(alas_html):
+    """the previous AmazonFeedDriver.get_fixes_for_html, without the coroutine per regex"""
+    arch_patterns = [r"src\b.+\.src", r"noarch\b.+\.noarch", r"x86_64\b.+\.x86_64"]
+    fixes = []
+    tree = SHTMLParser(alas_html)
+    if data := tree.body.select("#new_packages").matches[0]:
+        np_div = data.text().replace("\xa0", " ").strip()
+        for arch_pattern in arch_patterns:
+            found = re.search(arch_pattern, np_div)
+            if found:
+                fixes.append(found.group(0).split(":")[1].strip())
+    return fixes
+
+
+def load_corpus(corpus: Path, count: int):
+    pages = []
+    if corpus.is_dir():
+        pages = [
+            path.read_text()
+            for path in sorted(corpus.iterdir())
+            if path.is_file() and not path.name.endswith(".json")
+        ]
+    if not pages:
+        print(f"no saved pages in {corpus}, using {count} generated pages")
+        pages = [
+            body.decode()
+            for path, body in build_feed(count, "http://localhost").items()
+            if path.endswith(".html")
+        ]
+    return pages
+
+
+def run(name, func, pages):
+    found = 0
+    start_time = time.perf_counter()
+    for page in pages:
+        try:
+            found += len(func(page))
+        except IndexError:
+            # legacy raises for pages without #new_packages
+            pass
+    elapsed = time.perf_counter() - start_time
+    print(f"{name:<12}: {len(pages) / elapsed:.0f} pages/s, {found} packages found")
+    return elapsed
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--corpus", type=Path, default=driver_workspace / "html")
+    arg_parser.add_argument("--count", type=int, default=739)
+    arg_parser.add_argument("--rounds", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    pages = load_corpus(args.corpus, args.count) * args.rounds
+    legacy_time = run("Legacy", legacy_extract_fixes, pages)
+    single_time = run("Single pass", extract_fixes, pages)
+    print(f"Single pass is faster: {single_time < legacy_time}")
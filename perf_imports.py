@@ -0,0 +1,85 @@
+import argparse
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+"""
+Import time of the entry points, from python -X importtime run in a fresh interpreter for each of them: the total
+on top of the interpreter startup, the heaviest imports, and whether any library an entry point should import lazily got imported anyway.
+Exits non zero on such an import, or when an entry point goes over --budget-ms, so a regression fails loudly.
+"""
+
+importtime_pattern = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# statement run per entry point -> libraries it must not import
+entry_points = {
+    "cli": ("import cli", ("asyncio", "pydantic", "httpx", "aiohttp", "bs4", "xmltodict", "uvloop")),
+    "cli drivers": (
+        "import cli; cli.main(['drivers'])",
+        ("asyncio", "pydantic", "httpx", "aiohttp", "bs4", "xmltodict", "uvloop"),
+    ),
+    "amazon3": ("import amazon3", ("aiohttp", "bs4", "xmltodict", "uvloop", "multiprocessing", "pstats")),
+    "amazon2": ("import amazon2", ("pydantic", "httpx", "uvloop")),
+    "amazon": ("import amazon", ("pydantic", "httpx", "uvloop")),
+}
+
+
+def import_times(statement: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self us, cumulative us, depth) of every import of statement, depth 0 for the top level ones"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in proc.stderr.splitlines():
+        found = importtime_pattern.match(line)
+        if found:
+            # nested imports are indented by 2 more spaces per level
+            depth = (len(found.group(3)) - 1) // 2
+            imports.append((found.group(4), int(found.group(1)), int(found.group(2)), depth))
+    return imports
+
+
+def measure(statement: str, forbidden, startup: set, top: int, runs: int) -> Dict:
+    """
+    import time of statement on top of the interpreter startup (the modules python -c pass imports), and its
+    heaviest imports down to the modules the measured ones import themselves
+    """
+    # the best of several runs, the first one also pays for a cold page cache
+    best = min(
+        ([i for i in import_times(statement) if i[0] not in startup] for _ in range(runs)),
+        key=lambda imports: sum(i[2] for i in imports if i[3] == 0),
+    )
+    return {
+        "total_ms": sum(i[2] for i in best if i[3] == 0) / 1000,
+        "top": sorted((i for i in best if i[3] <= 1), key=lambda i: i[2], reverse=True)[:top],
+        "leaked": sorted(lib for lib in forbidden if any(i[0] == lib for i in best)),
+    }
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("names", nargs="*", help="entry points to measure, all by default")
+    arg_parser.add_argument("--top", type=int, default=8, help="heaviest top level imports listed per entry point")
+    arg_parser.add_argument("--runs", type=int, default=3)
+    arg_parser.add_argument("--budget-ms", type=float, help="fail when an entry point imports for longer")
+    args = arg_parser.parse_args()
+
+    startup = {module for module, _, _, _ in import_times("pass")}
+    failed = False
+    for name in args.names or entry_points:
+        statement, forbidden = entry_points[name]
+        result = measure(statement, forbidden, startup, args.top, args.runs)
+        print(f"{name}: {result['total_ms']:.1f} ms")
+        for module, self_us, cumulative_us, _ in result["top"]:
+            print(f"    {cumulative_us / 1000:8.1f} ms  {module} (self {self_us / 1000:.1f} ms)")
+        if result["leaked"]:
+            failed = True
+            print(f"    imported eagerly: {', '.join(result['leaked'])}")
+        if args.budget_ms is not None and result["total_ms"] > args.budget_ms:
+            failed = True
+            print(f"    over the {args.budget_ms} ms budget")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,65 @@
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from amazon3 import AmazonFeedDriver
+from index import AdvisoryIndex, IndexBuilder
+from stub_server import StubServer, build_feed
+
+"""
+Build the advisory index from AmazonFeedDriver against the stub server, then time the lookup of an installed
+package inventory through the memory mapped index
+"""
+
+
+async def build(url, workspace: Path, index_path: Path) -> IndexBuilder:
+    async with AmazonFeedDriver(workspace) as afd:
+        builder = await IndexBuilder().add_all(afd.extract(url, "2"))
+    builder.write(index_path)
+    return builder
+
+
+def check_epochs(index: AdvisoryIndex, inventory):
+    """the advisories list their fixes without an epoch, an installed version with one must match them the same"""
+    vulnerable = 0
+    for name, evr in inventory:
+        affected = index.affected(name, evr)
+        assert index.affected(name, f"1:{evr}") == affected, (name, evr)
+        vulnerable += bool(affected)
+    assert vulnerable, "no vulnerable package in the inventory"
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--count", type=int, default=739)
+    arg_parser.add_argument("--installed", type=int, default=5000)
+    args = arg_parser.parse_args()
+
+    with StubServer() as server, tempfile.TemporaryDirectory() as tmp:
+        server.routes.update(build_feed(args.count, server.url))
+        workspace = Path(tmp)
+        (workspace / "html").mkdir()
+        index_path = workspace / "alas.idx"
+        builder = asyncio.run(build(server.url + "/AL2/alas.rss", workspace, index_path))
+        print(
+            f"index: {len(builder.packages)} packages, {len(builder.cves)} cves, "
+            f"{index_path.stat().st_size} bytes"
+        )
+
+        rng = random.Random(42)
+        inventory = [
+            (f"package{rng.randrange(200)}", f"1.{rng.randrange(13)}.{rng.randrange(args.count)}-1.amzn2")
+            for _ in range(args.installed)
+        ]
+        start_time = time.perf_counter()
+        with AdvisoryIndex(index_path) as index:
+            affected = sum(len(index.affected(name, evr)) for name, evr in inventory)
+            elapsed = time.perf_counter() - start_time
+            check_epochs(index, inventory[:500])
+        print(
+            f"looked up {len(inventory)} installed packages in {elapsed * 1000:.1f} ms, "
+            f"{affected} vulnerable package/advisory pairs"
+        )
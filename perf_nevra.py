@@ -0,0 +1,49 @@
+import argparse
+import random
+import time
+
+import nevra
+from utils import split_rpm_filename
+
+"""
+Compare utils.split_rpm_filename with the nevra module over synthetic rpm filenames that repeat the way package
+names do across multi distro feeds
+"""
+
+
+def synthetic_filenames(count: int, unique: int):
+    arches = ["aarch64", "i686", "noarch", "src", "x86_64"]
+    names = [
+        f"{epoch}package{i}-{i % 7}.{i % 13}.{i % 31}-{i % 5 + 1}.amzn2.{arches[i % len(arches)]}.rpm"
+        for i in range(unique)
+        for epoch in ([""] if i % 4 else ["1:"])
+    ]
+    rng = random.Random(42)
+    return [rng.choice(names) for _ in range(count)]
+
+
+def run(name, func, filenames):
+    start_time = time.perf_counter()
+    func(filenames)
+    elapsed = time.perf_counter() - start_time
+    print(f"{name:<24}: {elapsed:.2f} seconds ({len(filenames) / elapsed / 1e6:.2f}M names/s)")
+    return elapsed
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--count", type=int, default=1_000_000)
+    arg_parser.add_argument("--unique", type=int, default=20_000)
+    args = arg_parser.parse_args()
+
+    filenames = synthetic_filenames(args.count, args.unique)
+    assert [tuple(n) for n in nevra.split_many(filenames[:1000])] == [
+        split_rpm_filename(f) for f in filenames[:1000]
+    ]
+    nevra.split.cache_clear()
+
+    legacy_time = run("split_rpm_filename", lambda names: [split_rpm_filename(n) for n in names], filenames)
+    run("nevra.parse (uncached)", lambda names: [nevra.parse(n) for n in names], filenames)
+    batch_time = run("nevra.split_many", nevra.split_many, filenames)
+    print(f"cache: {nevra.split.cache_info()}")
+    print(f"split_many is faster: {batch_time < legacy_time}")
@@ -0,0 +1,73 @@
+import argparse
+import gc
+import time
+import tracemalloc
+
+import nevra
+from amazon3 import AlasFixedIn, Summary, map_to_vulnerability, normalize_summary, split_title
+from feed import parse_items
+from fixes import extract_fixes
+from stub_server import build_feed
+
+"""
+Memory held by a fully loaded multi-feed dataset (AL1, AL2 and AL2022 feeds sharing their CVEs and packages), as
+Summary plus PVulnerability records, with and without the normalization stage
+"""
+
+releases = {"1": "/alas.rss", "2": "/AL2/alas.rss", "2022": "/AL2022/alas.rss"}
+
+
+def load_inputs(count: int):
+    """(release, rss item, fixes) of every advisory, each parsed from its own page like the driver does"""
+    inputs = []
+    for release, feed_path in releases.items():
+        routes = build_feed(count, "http://localhost", release=release)
+        for item in parse_items(routes[feed_path]):
+            page = routes[item["link"][len("http://localhost") :]]
+            inputs.append((release, item, extract_fixes(page)))
+    return inputs
+
+
+def build(inputs, normalize: bool):
+    records = []
+    for release, item, names in inputs:
+        summary = Summary.parse_obj(item)
+        summary.fixes = [AlasFixedIn.parse_obj({"name": name}) for name in names]
+        if normalize:
+            summary = normalize_summary(summary)
+        records.append((summary, map_to_vulnerability(summary, release)))
+    return records
+
+
+def measure(inputs, normalize: bool):
+    split_title.cache_clear()
+    nevra.split.cache_clear()
+    gc.collect()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    records = build(inputs, normalize)
+    elapsed = time.perf_counter() - start_time
+    split_title.cache_clear()
+    nevra.split.cache_clear()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return records, size, elapsed
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--count", type=int, default=2000, help="advisories per feed")
+    args = arg_parser.parse_args()
+
+    inputs = load_inputs(args.count)
+    results = {}
+    for name, normalize in (("raw", False), ("normalized", True)):
+        records, size, elapsed = measure(inputs, normalize)
+        results[name] = size
+        print(
+            f"{name:<10}: {len(records)} records, {size / 1024 / 1024:.1f} MB retained "
+            f"({size / len(records):.0f} bytes/record), built in {elapsed:.2f} seconds"
+        )
+        del records
+    print(f"normalized records use {100 * (1 - results['normalized'] / results['raw']):.1f}% less memory")
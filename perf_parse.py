@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from amazon3 import AmazonFeedDriver
+from fixes import ParseExecutor
+from stub_server import StubServer, build_feed
+
+"""
+Event loop lag and wall time of AmazonFeedDriver.extract for each ParseExecutor mode
+"""
+
+
+async def measure_lag(lags, interval=0.001):
+    """record how late a sleep(interval) wakes up, i.e. how long the loop was blocked"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def extract_all(url, workspace: Path, parse_executor: ParseExecutor):
+    lags = []
+    lag_task = asyncio.create_task(measure_lag(lags))
+    summary_count = 0
+    async with AmazonFeedDriver(workspace, parse_executor=parse_executor) as afd:
+        async for _ in afd.extract(url, "2"):
+            summary_count += 1
+    lag_task.cancel()
+    return summary_count, lags
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--count", type=int, default=739)
+    arg_parser.add_argument("--padding", type=int, default=2000)
+    arg_parser.add_argument("--batch-size", type=int, default=16)
+    args = arg_parser.parse_args()
+
+    results = []
+    with StubServer() as server, tempfile.TemporaryDirectory() as tmp:
+        server.routes.update(build_feed(args.count, server.url, padding=args.padding))
+        workspace = Path(tmp)
+        (workspace / "html").mkdir()
+        for mode in ParseExecutor.modes:
+            parse_executor = ParseExecutor(mode, batch_size=args.batch_size)
+            start_time = time.perf_counter()
+            count, lags = asyncio.run(
+                extract_all(server.url + "/AL2/alas.rss", workspace, parse_executor)
+            )
+            results.append((mode, count, time.perf_counter() - start_time, sorted(lags)))
+            parse_executor.shutdown()
+
+    for mode, count, elapsed, lags in results:
+        p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+        print(
+            f"{mode:<8}: {count} items in {elapsed:.2f} seconds - loop lag max {max(lags, default=0) * 1000:.1f} ms, "
+            f"p99 {p99 * 1000:.1f} ms"
+        )
@@ -0,0 +1,121 @@
+import argparse
+import asyncio
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+from amazon3 import AmazonFeedDriver, item_host
+from client import PooledClient
+from retry import CircuitBreaker, RetryPolicy
+from scheduler import Scheduler
+from stub_server import StubServer, build_feed
+from utils import download_remote_file
+
+"""
+Fault injection run of AmazonFeedDriver against the stub server: advisory pages answered 503 with a Retry-After, feed
+downloads failing or cut half way, and an outage of every page at the start of the run that opens the circuit
+breaker. Checks that every advisory is still extracted, that Retry-After is waited for, and that the breaker goes
+open -> half open (a single probe) -> closed and gives the scheduler its rate limit back.
+"""
+
+
+async def check_retry_after(url: str, retry_after: float):
+    """every retry of a 503 waits the Retry-After of the response, not the (here zero) backoff"""
+    policy = RetryPolicy(attempts=3, base_delay=0.0)
+    async with PooledClient() as client:
+        start_time = time.perf_counter()
+        try:
+            await policy.call(download_remote_file, url, None, client=client)
+        except httpx.HTTPStatusError as err:
+            assert err.response.status_code == 503, err
+        else:
+            raise AssertionError("a page always answering 503 was downloaded")
+        elapsed = time.perf_counter() - start_time
+    assert policy.retries == 2 and policy.failures == 1, policy.report()
+    assert elapsed >= 2 * retry_after, f"retried after {elapsed:.2f}s, Retry-After is {retry_after}s"
+
+
+async def check_breaker(cooldown: float = 0.1):
+    """the half open breaker lets a single probe through until one succeeds"""
+    scheduler = Scheduler(workers=4, rate=100.0)
+    rate_limit = scheduler.rate_limit
+    breaker = CircuitBreaker(min_calls=4, cooldown=cooldown, scheduler=scheduler)
+    for _ in range(4):
+        breaker.record(False)
+    assert breaker.state == "open" and scheduler.rate_limit is not rate_limit
+
+    waiters = [asyncio.ensure_future(breaker.wait()) for _ in range(5)]
+    await asyncio.sleep(cooldown * 1.5)
+    assert breaker.state == "half_open"
+    assert sum(waiter.done() for waiter in waiters) == 1, "more than one probe in half open"
+
+    # the probe fails: open again, nobody goes through before the next cooldown
+    breaker.record(False)
+    assert breaker.state == "open" and breaker.opened == 2
+    await asyncio.sleep(cooldown / 2)
+    assert sum(waiter.done() for waiter in waiters) == 1
+    await asyncio.sleep(cooldown)
+    assert sum(waiter.done() for waiter in waiters) == 2, "no single probe after the second cooldown"
+
+    # the probe succeeds: closed, every caller goes through and the scheduler gets its rate limit back
+    breaker.record(True)
+    await asyncio.wait_for(asyncio.gather(*waiters), cooldown)
+    assert breaker.state == "closed" and scheduler.rate_limit is rate_limit
+
+
+async def extract(url: str, workspace: Path, cooldown: float, retry_rounds: int):
+    scheduler = Scheduler(workers=20, max_per_host=20, key=item_host)
+    breaker = CircuitBreaker(cooldown=cooldown, scheduler=scheduler, slow_rate=20.0)
+    policy = RetryPolicy(base_delay=0.05, breaker=breaker, seed=42)
+    async with AmazonFeedDriver(
+        workspace, scheduler=scheduler, retry_policy=policy, retry_rounds=retry_rounds
+    ) as afd:
+        ids = [summary.id async for summary in afd.extract(url, "2")]
+        return ids, afd.report(), breaker, scheduler
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--count", type=int, default=200)
+    arg_parser.add_argument("--error-rate", type=float, default=0.2)
+    arg_parser.add_argument("--feed-error-rate", type=float, default=0.5)
+    arg_parser.add_argument("--retry-after", type=float, default=0.1, help="seconds, sent with the 503s")
+    arg_parser.add_argument("--outage", type=float, default=0.5, help="seconds every page fails at the start")
+    arg_parser.add_argument("--cooldown", type=float, default=0.2, help="of the circuit breaker")
+    arg_parser.add_argument("--retry-rounds", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    asyncio.run(check_breaker())
+    print("breaker: open -> half open with a single probe -> open -> closed")
+
+    with StubServer(
+        error_rate=1.0, retry_after=str(args.retry_after), feed_error_rate=args.feed_error_rate
+    ) as server, tempfile.TemporaryDirectory() as tmp:
+        server.routes.update(build_feed(args.count, server.url))
+        asyncio.run(check_retry_after(server.url + "/AL2/ALAS2-2021-0001.html", args.retry_after))
+        print(f"retry-after: waited {args.retry_after}s before each retry")
+
+        workspace = Path(tmp)
+        (workspace / "html").mkdir()
+        # the outage ends while the run goes on, then only error_rate of the pages fail
+        threading.Timer(args.outage, setattr, (server, "error_rate", args.error_rate)).start()
+        start_time = time.perf_counter()
+        ids, report, breaker, scheduler = asyncio.run(
+            extract(server.url + "/AL2/alas.rss", workspace, args.cooldown, args.retry_rounds)
+        )
+        elapsed = time.perf_counter() - start_time
+
+    retry = report["retry"]
+    print(
+        f"extracted {len(ids)}/{args.count} advisories in {elapsed:.2f}s, {server.error_count} injected errors, "
+        f"{retry['retries']} retries, {retry['failures']} failures, breaker opened {retry['breaker_opened']} times, "
+        f"{len(report['failed'])} advisories failed"
+    )
+    assert sorted(ids) == sorted(set(ids)), "an advisory was yielded twice"
+    assert len(ids) == args.count, f"missing advisories: {report['failed']}"
+    assert retry["retries"] > 0
+    assert retry["breaker_opened"] > 0, "the outage did not open the breaker"
+    assert breaker.state == "closed" and scheduler.rate_limit is None, "the breaker did not close after the outage"
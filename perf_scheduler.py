@@ -0,0 +1,51 @@
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from amazon3 import AmazonFeedDriver, item_host
+from scheduler import Scheduler
+from stub_server import StubServer, build_feed
+
+"""
+Advisory throughput of AmazonFeedDriver.extract for different scheduler worker counts, against a local stub
+server that adds latency to every response
+"""
+
+
+async def extract_all(url, workspace: Path, scheduler: Scheduler):
+    summary_count = 0
+    async with AmazonFeedDriver(workspace, scheduler=scheduler) as afd:
+        async for _ in afd.extract(url, "2"):
+            summary_count += 1
+    return summary_count
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--count", type=int, default=200)
+    arg_parser.add_argument("--latency", type=float, default=0.05)
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[1, 5, 10, 20, 50])
+    arg_parser.add_argument("--rate", type=float, default=None)
+    args = arg_parser.parse_args()
+
+    results = []
+    with StubServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        server.routes.update(build_feed(args.count, server.url))
+        workspace = Path(tmp)
+        (workspace / "html").mkdir()
+        for workers in args.workers:
+            scheduler = Scheduler(
+                workers=workers, max_per_host=workers, rate=args.rate, key=item_host
+            )
+            start_time = time.perf_counter()
+            count = asyncio.run(
+                extract_all(server.url + "/AL2/alas.rss", workspace, scheduler)
+            )
+            results.append((workers, count, time.perf_counter() - start_time))
+
+    for workers, count, elapsed in results:
+        print(
+            f"workers: {workers:>3} - processed {count} items in {elapsed:.2f} seconds ({count / elapsed:.1f} items/s)"
+        )
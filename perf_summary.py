@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+import time
+
+from amazon3 import Summary, split_title
+from feed import parse_items
+from stub_server import build_feed
+
+"""
+Records per second of building Summary objects one rss item at a time (Summary.async_parse) against the bulk
+Summary.parse_many, validated and trusted
+"""
+
+
+async def per_item(items):
+    return [await Summary.async_parse(item) for item in items]
+
+
+def run(name, func, items):
+    split_title.cache_clear()
+    start_time = time.perf_counter()
+    summaries = func(items)
+    elapsed = time.perf_counter() - start_time
+    print(f"{name:<24}: {elapsed:.3f} seconds ({len(items) / elapsed:.0f} records/s)")
+    return summaries
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--count", type=int, default=739)
+    arg_parser.add_argument("--rounds", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    items = parse_items(build_feed(args.count, "http://localhost")["/AL2/alas.rss"]) * args.rounds
+    expected = run("async_parse per item", lambda i: asyncio.run(per_item(i)), items)
+    validated = run("parse_many", Summary.parse_many, items)
+    trusted = run("parse_many trusted", lambda i: Summary.parse_many(i, trusted=True), items)
+    print(f"Same summaries: {expected == validated == trusted}")
@@ -1,16 +1,16 @@
 import asyncio
 import time
 
-import amazon as async_amazon
-import amazon2 as new_amazon
-
-from anchore_enterprise.services.feeds.drivers.amazon import data as legacy
 from anchore_engine.decorators import profile
 
+# the drivers are imported by the test running them, not all of them to run one
+
 
 @profile
 def legacy_feed_load():
     """Load the Amazon ALAS vulnerability data using the legacy driver from Enterprise."""
+    from anchore_enterprise.services.feeds.drivers.amazon import data as legacy
+
     summary_count = 0
 
     generator, state = legacy.fetch(task_id=42, skip_if_exists=False, previous_state=None, config=None)
@@ -24,6 +24,8 @@ def legacy_feed_load():
 @profile
 async def async_feed_load():
     """Load the Amazon ALAS vulnerability data with the asyncio driver."""
+    import amazon as async_amazon
+
     summary_count = 0
 
     async for item in async_amazon.items():
@@ -35,6 +37,8 @@ async def async_feed_load():
 @profile
 async def new_async_feed_load():
     """Load the Amazon ALAS vulnerability data with the new asyncio driver."""
+    import amazon2 as new_amazon
+
     summary_count = 0
 
     async for item in new_amazon.items():
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from typing import AsyncGenerator, Callable, Dict, Optional
+
+from scheduler import Scheduler
+
+"""
+Staged processing pipeline: every stage runs its own workers and hands its results to the next stage through a
+bounded queue, so network bound and cpu bound work can be sized separately
+"""
+
+
+class StageStats:
+    __slots__ = ("queued", "active", "processed", "errors", "latency_total", "latency_max")
+
+    def __init__(self):
+        self.queued = 0
+        self.active = 0
+        self.processed = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "queued": self.queued,
+            "active": self.active,
+            "processed": self.processed,
+            "errors": self.errors,
+            "latency_avg": self.latency_total / self.processed if self.processed else 0.0,
+            "latency_max": self.latency_max,
+        }
+
+
+class Stage:
+    """
+    One step of a Pipeline. func takes the upstream result and returns (or awaits to) the value passed downstream,
+    returning None drops the item. Items that raise are counted as errors and handed to on_error(item, err), by
+    default the error is printed and the item dropped.
+
+    The stage's work queue and worker count come from its Scheduler, so a fetch stage can use per host caps and
+    rate limits while a parse stage only sets a worker count.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        workers: int = 1,
+        scheduler: Optional[Scheduler] = None,
+        on_error: Optional[Callable] = None,
+    ):
+        self.name = name
+        self.func = func
+        self.is_coroutine = asyncio.iscoroutinefunction(func)
+        self.scheduler = scheduler if scheduler is not None else Scheduler(workers=workers)
+        self.on_error = on_error
+        self.stats = StageStats()
+
+    async def _enqueue(self, upstream) -> AsyncGenerator:
+        async for item in upstream:
+            self.stats.queued += 1
+            yield item
+
+    async def _call(self, item):
+        self.stats.queued -= 1
+        self.stats.active += 1
+        start = time.perf_counter()
+        try:
+            if self.is_coroutine:
+                return await self.func(item)
+            return self.func(item)
+        finally:
+            latency = time.perf_counter() - start
+            self.stats.active -= 1
+            self.stats.processed += 1
+            self.stats.latency_total += latency
+            self.stats.latency_max = max(self.stats.latency_max, latency)
+
+    async def _call_with_item(self, item):
+        try:
+            return await self._call(item)
+        except Exception as err:
+            self.on_error(item, err)
+            raise
+
+    async def run(self, upstream) -> AsyncGenerator:
+        call = self._call if self.on_error is None else self._call_with_item
+        async for fut in self.scheduler.as_completed(call, self._enqueue(upstream)):
+            try:
+                result = await fut
+            except Exception as err:
+                self.stats.errors += 1
+                if self.on_error is None:
+                    print(f"{self.name}: {err}")
+                continue
+            if result is not None:
+                yield result
+
+
+class Pipeline:
+    """
+    Chain of stages over an (async) iterable source:
+
+    pipeline = Pipeline(Stage("fetch", fetch, workers=20), Stage("parse", parse, workers=4))
+    async for result in pipeline.run(items):
+        ...
+    """
+
+    def __init__(self, *stages: Stage):
+        self.stages = stages
+
+    async def _source(self, source) -> AsyncGenerator:
+        if hasattr(source, "__aiter__"):
+            async for item in source:
+                yield item
+        else:
+            for item in source:
+                yield item
+
+    async def run(self, source) -> AsyncGenerator:
+        stream = self._source(source)
+        for stage in self.stages:
+            stream = stage.run(stream)
+        async for result in stream:
+            yield result
+
+    def report(self) -> Dict[str, dict]:
+        """per stage queue depth, in flight items, counts and latency"""
+        return {stage.name: stage.stats.to_dict() for stage in self.stages}
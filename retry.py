@@ -0,0 +1,251 @@
+import asyncio
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import AsyncGenerator, Optional
+
+import httpx
+
+from instrumentation import Histogram, nearest_rank
+from scheduler import Scheduler, TokenBucket
+
+"""
+Retry policy for the feed downloads: exponential backoff with jitter, Retry-After on 429/503, timeouts derived from
+the latencies observed so far, and a circuit breaker that throttles the fetch scheduler while the error rate is high
+"""
+
+
+def retry_after(resp: httpx.Response) -> Optional[float]:
+    """seconds a 429/503 response asks to wait, from a Retry-After header in seconds or as an http date"""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome of the last `window` requests. Once at least min_calls are known and the share of failures
+    reaches error_rate the breaker opens: callers wait for `cooldown` seconds and the scheduler is throttled to
+    `slow_rate` requests per second. After the cooldown a single probe request goes through (half open) while the
+    other callers keep waiting: its success closes the breaker and restores the scheduler's own rate limit, its
+    failure opens the breaker again. A probe that never reports (e.g. cancelled) hands its turn to the next caller
+    after another cooldown.
+    """
+
+    def __init__(
+        self,
+        window: int = 50,
+        error_rate: float = 0.5,
+        min_calls: int = 10,
+        cooldown: float = 5.0,
+        scheduler: Optional[Scheduler] = None,
+        slow_rate: float = 2.0,
+    ):
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.scheduler = scheduler
+        self.slow_rate = slow_rate
+        self.state = "closed"
+        self.opened = 0
+        self._outcomes = deque(maxlen=window)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._saved_rate_limit = None
+        self._probing = False
+        self._settled: Optional[asyncio.Event] = None
+
+    def _settle(self):
+        """the half open probe reported, wake the callers waiting on it"""
+        self._probing = False
+        if self._settled is not None:
+            self._settled.set()
+            self._settled = None
+
+    def _open(self):
+        if self.state == "closed" and self.scheduler is not None:
+            self._saved_rate_limit = self.scheduler.rate_limit
+            self.scheduler.rate_limit = TokenBucket(self.slow_rate, 1)
+        self.state = "open"
+        self.opened += 1
+        self._opened_at = time.monotonic()
+
+    def _close(self):
+        self.state = "closed"
+        self._outcomes.clear()
+        self._failures = 0
+        if self.scheduler is not None:
+            self.scheduler.rate_limit = self._saved_rate_limit
+            self._saved_rate_limit = None
+
+    def record(self, ok: bool):
+        if self.state == "half_open":
+            if ok:
+                self._close()
+            else:
+                self._open()
+            self._settle()
+            return
+        if len(self._outcomes) == self._outcomes.maxlen and not self._outcomes[0]:
+            self._failures -= 1
+        self._outcomes.append(ok)
+        self._failures += not ok
+        if (
+            self.state == "closed"
+            and len(self._outcomes) >= self.min_calls
+            and self._failures / len(self._outcomes) >= self.error_rate
+        ):
+            self._open()
+
+    async def wait(self):
+        """wait out the cooldown of an open breaker, then the probe of the half open one unless this call is it"""
+        while self.state != "closed":
+            if self.state == "open":
+                remaining = self._opened_at + self.cooldown - time.monotonic()
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                if self.state == "open":
+                    self.state = "half_open"
+                continue
+            if not self._probing:
+                self._probing = True
+                return
+            if self._settled is None:
+                self._settled = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._settled.wait(), self.cooldown)
+            except asyncio.TimeoutError:
+                # the probe never reported
+                if self.state == "half_open":
+                    self._probing = False
+
+
+class RetryPolicy:
+    """
+    Runs a download coroutine function with retries:
+
+    policy = RetryPolicy(breaker=CircuitBreaker(scheduler=scheduler))
+    text = await policy.call(download_remote_file, url, path, client=client)
+
+    - the function is called with timeout=, max_timeout until min_samples downloads succeeded, then timeout_factor
+      times the p99 of the successful download latencies, within min_timeout and max_timeout
+    - transport errors, timeouts and retry_statuses are retried up to `attempts` calls in total, after a full jitter
+      exponential backoff (uniform 0..min(max_delay, base_delay * 2 ** retry)) or the response's Retry-After
+    - other http errors (e.g. a 404) are raised right away
+    """
+
+    retry_statuses = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(
+        self,
+        attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        max_retry_after: float = 60.0,
+        min_timeout: float = 5.0,
+        max_timeout: float = 125.0,
+        timeout_factor: float = 4.0,
+        min_samples: int = 20,
+        breaker: Optional[CircuitBreaker] = None,
+        seed: Optional[int] = None,
+    ):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor
+        self.min_samples = min_samples
+        self.breaker = breaker
+        self.latency = Histogram()
+        self.retries = 0
+        self.failures = 0
+        self._timeout = max_timeout
+        self._rng = random.Random(seed)
+
+    def timeout(self) -> float:
+        return self._timeout
+
+    def _observe(self, latency: float):
+        self.latency.add(int(latency * 1e9))
+        count = len(self.latency.values)
+        # percentiles are recomputed every min_samples downloads, not on every call
+        if count >= self.min_samples and count % self.min_samples == 0:
+            p99 = nearest_rank(sorted(self.latency.values), 99) / 1e9
+            self._timeout = min(self.max_timeout, max(self.min_timeout, p99 * self.timeout_factor))
+
+    def backoff(self, retry: int) -> float:
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2**retry))
+
+    def _failed(self, err: Exception, attempt: int) -> float:
+        """record a failed attempt and return the delay before the next one, raise err when it is not retried"""
+        delay = None
+        if isinstance(err, httpx.HTTPStatusError):
+            if err.response.status_code not in self.retry_statuses:
+                # the server answered, so it counts as up for the breaker
+                if self.breaker is not None:
+                    self.breaker.record(True)
+                raise err
+            delay = retry_after(err.response)
+        if self.breaker is not None:
+            self.breaker.record(False)
+        if attempt == self.attempts - 1:
+            self.failures += 1
+            raise err
+        self.retries += 1
+        return min(delay, self.max_retry_after) if delay is not None else self.backoff(attempt)
+
+    async def call(self, func, *args, **kwargs):
+        for attempt in range(self.attempts):
+            if self.breaker is not None:
+                await self.breaker.wait()
+            start = time.perf_counter()
+            try:
+                result = await func(*args, timeout=self.timeout(), **kwargs)
+            except (httpx.HTTPStatusError, httpx.TransportError) as err:
+                delay = self._failed(err, attempt)
+            else:
+                self._observe(time.perf_counter() - start)
+                if self.breaker is not None:
+                    self.breaker.record(True)
+                return result
+            await asyncio.sleep(delay)
+
+    async def stream(self, func, *args, **kwargs) -> AsyncGenerator:
+        """
+        call for an async generator function, e.g. utils.stream_remote_file: a stream failing with a retried error
+        is started over from its beginning, so after a retry the values yielded by the failed attempt come again
+        and the caller has to skip them. Streams are not timed, their duration depends on the consumer.
+        """
+        for attempt in range(self.attempts):
+            if self.breaker is not None:
+                await self.breaker.wait()
+            try:
+                async for value in func(*args, timeout=self.timeout(), **kwargs):
+                    yield value
+            except (httpx.HTTPStatusError, httpx.TransportError) as err:
+                delay = self._failed(err, attempt)
+            else:
+                if self.breaker is not None:
+                    self.breaker.record(True)
+                return
+            await asyncio.sleep(delay)
+
+    def report(self) -> dict:
+        return {
+            "retries": self.retries,
+            "failures": self.failures,
+            "timeout": self._timeout,
+            "latency": self.latency.to_dict(),
+            "breaker_opened": self.breaker.opened if self.breaker is not None else 0,
+        }
@@ -0,0 +1,132 @@
+import asyncio
+import contextlib
+import time
+from collections import defaultdict
+from typing import AsyncGenerator, Callable, Optional
+
+"""
+Bounded concurrency work queue used by the feed drivers to fetch and parse advisories
+"""
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter: allows bursts of up to capacity calls, refilled at rate tokens per second
+    """
+
+    def __init__(self, rate: float, capacity: Optional[int] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class Scheduler:
+    """
+    Runs a coroutine function over a stream of items with a fixed number of workers.
+
+    - workers: number of items processed at the same time
+    - max_per_host: cap on concurrent items sharing the same key(item), usually the host of the url
+    - rate: optional token bucket limit on how many items are started per second
+    - budget: optional cap on items processed at the same time across every as_completed run of this scheduler,
+      so concurrent runs (e.g. one per feed) share a global concurrency budget
+    - backpressure: at most `workers` finished results are buffered, once the consumer stops reading
+      the workers block and no new items are started
+    """
+
+    def __init__(
+        self,
+        workers: int = 20,
+        max_per_host: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        key: Optional[Callable] = None,
+        budget: Optional[int] = None,
+    ):
+        self.workers = workers
+        self.max_per_host = max_per_host
+        self.rate_limit = TokenBucket(rate, burst) if rate else None
+        self.key = key
+        self.budget = asyncio.Semaphore(budget) if budget else None
+
+    async def _feed(self, items, queue: asyncio.Queue):
+        try:
+            if hasattr(items, "__aiter__"):
+                async for item in items:
+                    await queue.put(item)
+            else:
+                for item in items:
+                    await queue.put(item)
+        finally:
+            for _ in range(self.workers):
+                await queue.put(None)
+
+    async def _work(self, func, queue: asyncio.Queue, results: asyncio.Queue, host_limits):
+        loop = asyncio.get_running_loop()
+        while (item := await queue.get()) is not None:
+            if self.rate_limit:
+                await self.rate_limit.acquire()
+            fut = loop.create_future()
+            try:
+                if host_limits is None and self.budget is None:
+                    fut.set_result(await func(item))
+                else:
+                    async with contextlib.AsyncExitStack() as limits:
+                        if host_limits is not None:
+                            await limits.enter_async_context(host_limits[self.key(item)])
+                        if self.budget is not None:
+                            await limits.enter_async_context(self.budget)
+                        fut.set_result(await func(item))
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                fut.set_exception(err)
+            await results.put(fut)
+        await results.put(None)
+
+    async def as_completed(self, func, items) -> AsyncGenerator:
+        """
+        Yield one completed future per item, in completion order, the same way asyncio.as_completed does:
+
+        async for fut in scheduler.as_completed(process, items):
+            result = await fut
+        """
+        queue = asyncio.Queue(maxsize=self.workers)
+        results = asyncio.Queue(maxsize=self.workers)
+        host_limits = None
+        if self.max_per_host and self.key:
+            host_limits = defaultdict(lambda: asyncio.Semaphore(self.max_per_host))
+
+        tasks = [asyncio.create_task(self._feed(items, queue))]
+        tasks += [
+            asyncio.create_task(self._work(func, queue, results, host_limits))
+            for _ in range(self.workers)
+        ]
+        try:
+            running = self.workers
+            while running:
+                fut = await results.get()
+                if fut is None:
+                    running -= 1
+                else:
+                    yield fut
+            # surface errors raised while reading the items
+            await tasks[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,414 @@
+import argparse
+import asyncio
+import contextlib
+import heapq
+import json
+import math
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import AsyncGenerator, Dict, Iterator, List, Optional, Tuple, Union
+
+from amazon3 import (
+    AlasFixedIn,
+    AmazonFeedDriver,
+    DeletedSummary,
+    Summary,
+    alas_fixed_in_fields,
+    normalize_summary,
+)
+from filters import FilterSpec, alas_id_key
+from sync_state import SyncState
+
+"""
+Sharded sync of one ALAS feed: the rss items are split by a stable hash of their ALAS id (filters.shard_of) into
+shards, every shard is extracted by its own AmazonFeedDriver in its own process and event loop, and the results are
+merged back into one stream ordered by ALAS id. HTML parsing and model validation then use as many cores as shards.
+
+The shards are handed out through a directory used as a queue, so the same run works with a local process pool and
+with workers on other hosts sharing the directory (python shards.py worker <directory>):
+
+    tasks/<run>-<index>.json      shard waiting for a worker
+    claimed/<run>-<index>.json    shard taken by a worker, moved there with an atomic rename and touched by the
+                                  worker every lease / 4 seconds while it runs, removed once the shard is done
+    results/<run>-<index>.ndjson  records of a finished shard, sorted by ALAS id, renamed in place once complete
+    results/<run>-<index>.json    report of the shard's driver
+    failed/<run>-<index>.txt      traceback of a shard that raised
+A claimed shard whose file was not touched for a lease (its worker died) is queued again by the coordinator, and
+reported as failed once it used up its attempts.
+"""
+
+queue_dirs = ("tasks", "claimed", "results", "failed")
+
+
+def init_queue(root: Path):
+    for name in queue_dirs:
+        (root / name).mkdir(parents=True, exist_ok=True)
+
+
+# after every known id, ordered by id among themselves
+unknown_id_key = (math.inf, math.inf)
+
+
+def record_key(record: Union[Summary, DeletedSummary]):
+    return alas_id_key(record.id) or unknown_id_key, record.id
+
+
+def dump_record(record: Union[Summary, DeletedSummary]) -> str:
+    return record.json()
+
+
+def load_record(line: str, normalize: bool = True) -> Union[Summary, DeletedSummary]:
+    """rebuild a record written by dump_record, validated by the shard already so without validating it again"""
+    data = json.loads(line)
+    if data.get("deleted"):
+        return DeletedSummary.construct(**data)
+    fixes = data.pop("fixes")
+    summary = Summary.construct(
+        **data,
+        fixes=[AlasFixedIn.construct(alas_fixed_in_fields, **fix) for fix in fixes] if fixes is not None else None,
+    )
+    # shares the interned strings of this process again
+    return normalize_summary(summary) if normalize else summary
+
+
+async def extract_shard(task: dict) -> Tuple[List[Union[Summary, DeletedSummary]], dict]:
+    """the records of one shard, sorted by ALAS id, and the report of its driver"""
+    options = dict(task["options"])
+    workspace = Path(task["workspace"]) / "shard-{}-of-{}".format(task["index"], task["shards"])
+    (workspace / "html").mkdir(parents=True, exist_ok=True)
+    if options.pop("incremental", False):
+        # shard_of is stable, each shard keeps the state of its own advisories as long as the shard count is the same
+        options["state"] = SyncState(workspace / "state.json")
+    filters = FilterSpec(shard=(task["index"], task["shards"]))
+    async with AmazonFeedDriver(workspace, **options) as driver:
+        records = [record async for record in driver.extract(task["url"], task["version"], filters)]
+        report = driver.report()
+    records.sort(key=record_key)
+    return records, report
+
+
+def run_task(root: Path, name: str, task: dict, use_uvloop: bool = True):
+    try:
+        if use_uvloop:
+            import uvloop
+
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        records, report = asyncio.run(extract_shard(task))
+        tmp_path = root / "results" / (name + ".ndjson.tmp")
+        with open(tmp_path, "w") as fp:
+            for record in records:
+                fp.write(dump_record(record) + "\n")
+        report["host"] = socket.gethostname()
+        (root / "results" / (name + ".json")).write_text(json.dumps(report))
+        # the coordinator only picks up complete results
+        tmp_path.replace(root / "results" / (name + ".ndjson"))
+    except Exception:
+        (root / "failed" / (name + ".txt")).write_text(traceback.format_exc())
+
+
+@contextlib.contextmanager
+def heartbeat(path: Path, interval: float):
+    """touch path every interval seconds from a thread, while the shard runs on the event loop of this one"""
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(interval):
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                # queued again by the coordinator, which gave up on this worker
+                return
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def claim(root: Path, run: Optional[str] = None) -> Optional[Path]:
+    """move a waiting task (of run, or of any run) to claimed/, None when there is none left"""
+    pattern = run + "-*.json" if run else "*.json"
+    for task_path in sorted((root / "tasks").glob(pattern)):
+        claimed_path = root / "claimed" / task_path.name
+        try:
+            # atomic, of the workers racing for a task exactly one rename succeeds
+            task_path.rename(claimed_path)
+        except FileNotFoundError:
+            continue
+        return claimed_path
+    return None
+
+
+def work(
+    root: Path,
+    run: Optional[str] = None,
+    use_uvloop: bool = True,
+    idle_timeout: float = 0.0,
+    poll_interval: float = 1.0,
+) -> int:
+    """
+    worker loop: run shard tasks from the queue directory until none showed up for idle_timeout seconds
+    :param run: only take the tasks of this run, and keep waiting while any of them is still claimed, it may be
+    queued again
+    :returns: number of tasks run
+    """
+    init_queue(root)
+    count = 0
+    idle_since = time.monotonic()
+    while True:
+        claimed_path = claim(root, run)
+        if claimed_path is None:
+            running = run is not None and any((root / "claimed").glob(run + "-*.json"))
+            if not running and time.monotonic() - idle_since >= idle_timeout:
+                return count
+            time.sleep(poll_interval)
+            continue
+        name = claimed_path.stem
+        task = json.loads(claimed_path.read_text())
+        with heartbeat(claimed_path, task["lease"] / 4):
+            run_task(root, name, task, use_uvloop)
+        claimed_path.unlink(missing_ok=True)
+        count += 1
+        idle_since = time.monotonic()
+
+
+class ShardedSync:
+    """
+    One feed split across shards processes:
+
+    sync = ShardedSync(workspace, url, version, shards=4)
+    async for record in sync.items():
+        ...
+
+    - queue_dir: directory used as the queue, shared with the workers of other hosts; workspace/shards by default
+    - workers: local worker processes, shards by default; 0 leaves every shard to the workers of other hosts
+    - use_uvloop: run the shards on uvloop
+    - timeout: seconds to wait for all the shards, forever by default
+    - lease: seconds a claimed shard may go without a heartbeat of its worker before it is queued again, measured
+      on this host's clock so the clocks of the worker hosts do not matter
+    - attempts: times a shard is handed out before a lost worker fails it
+    - options: AmazonFeedDriver options of every shard, they have to be json serializable (parse_workers,
+      normalize, retry_rounds, report_deletions...); incremental=True gives every shard its own SyncState
+    Records are yielded once every shard is done, merged in ALAS id order. Shards that failed raise a RuntimeError
+    with their tracebacks, so does a local worker process that died (e.g. BrokenProcessPool) without waiting for
+    the lease.
+    """
+
+    def __init__(
+        self,
+        workspace: Path,
+        url: str,
+        version: str,
+        shards: int = 4,
+        queue_dir: Optional[Path] = None,
+        workers: Optional[int] = None,
+        use_uvloop: bool = True,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.2,
+        lease: float = 30.0,
+        attempts: int = 2,
+        **options,
+    ):
+        if shards < 1:
+            raise ValueError("Invalid shard count: {}".format(shards))
+        self.workspace = workspace
+        self.url = url
+        self.version = version
+        self.shards = shards
+        self.queue_dir = queue_dir if queue_dir is not None else workspace / "shards"
+        self.workers = shards if workers is None else workers
+        self.use_uvloop = use_uvloop
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.attempts = attempts
+        self.options = options
+        self.run_id = "{}-{}".format(version, uuid.uuid4().hex[:8])
+        self.reports: Dict[int, dict] = {}
+        # shard index -> times handed out, and (mtime of its claimed file, when that mtime was first seen)
+        self._handed_out: Dict[int, int] = {}
+        self._heartbeats: Dict[int, Tuple[float, float]] = {}
+
+    def task_name(self, index: int) -> str:
+        return "{}-{}".format(self.run_id, index)
+
+    def queue(self, index: int):
+        task = {
+            "url": self.url,
+            "version": self.version,
+            "index": index,
+            "shards": self.shards,
+            "workspace": str(self.workspace),
+            "lease": self.lease,
+            "options": self.options,
+        }
+        task_path = self.queue_dir / "tasks" / (self.task_name(index) + ".json")
+        tmp_path = task_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(task))
+        tmp_path.replace(task_path)
+        self._handed_out[index] = self._handed_out.get(index, 0) + 1
+        self._heartbeats.pop(index, None)
+
+    def submit(self):
+        init_queue(self.queue_dir)
+        for index in range(self.shards):
+            self.queue(index)
+
+    def check_lease(self, index: int):
+        """queue a claimed shard again, or fail it, when its worker stopped touching it for a lease"""
+        claimed_path = self.queue_dir / "claimed" / (self.task_name(index) + ".json")
+        try:
+            mtime = claimed_path.stat().st_mtime
+        except FileNotFoundError:
+            return
+        now = time.monotonic()
+        seen = self._heartbeats.get(index)
+        if seen is None or seen[0] != mtime:
+            self._heartbeats[index] = (mtime, now)
+            return
+        if now - seen[1] < self.lease:
+            return
+        try:
+            claimed_path.unlink()
+        except FileNotFoundError:
+            # finished in the meantime
+            return
+        if self._handed_out[index] < self.attempts:
+            self.queue(index)
+        else:
+            (self.queue_dir / "failed" / (self.task_name(index) + ".txt")).write_text(
+                "worker lost: no heartbeat for {} seconds, {} attempts\n".format(self.lease, self._handed_out[index])
+            )
+
+    async def wait(self, local_workers: Optional[asyncio.Future] = None):
+        """
+        until every shard has a result or failed
+        :param local_workers: the gathered futures of the local worker processes, their errors are raised at once
+        """
+        results, failed = self.queue_dir / "results", self.queue_dir / "failed"
+        deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+        while True:
+            pending = [
+                index
+                for index in range(self.shards)
+                if not (results / (self.task_name(index) + ".ndjson")).exists()
+                and not (failed / (self.task_name(index) + ".txt")).exists()
+            ]
+            if not pending:
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("{} of {} shards not done".format(len(pending), self.shards))
+            for index in pending:
+                self.check_lease(index)
+            if local_workers is not None and local_workers.done():
+                try:
+                    local_workers.result()
+                except Exception as err:
+                    raise RuntimeError("local shard worker failed: {!r}".format(err)) from err
+                # exited without error, what is left is up to the workers of other hosts
+                local_workers = None
+            await asyncio.sleep(self.poll_interval)
+
+        errors = []
+        for index in range(self.shards):
+            failed_path = failed / (self.task_name(index) + ".txt")
+            if failed_path.exists():
+                errors.append("shard {}:\n{}".format(index, failed_path.read_text()))
+            else:
+                self.reports[index] = json.loads((results / (self.task_name(index) + ".json")).read_text())
+        if errors:
+            raise RuntimeError("\n".join(errors))
+
+    def read_shard(self, index: int) -> Iterator[Union[Summary, DeletedSummary]]:
+        normalize = self.options.get("normalize", True)
+        with open(self.queue_dir / "results" / (self.task_name(index) + ".ndjson")) as fp:
+            for line in fp:
+                yield load_record(line, normalize)
+
+    def cleanup(self):
+        for name in queue_dirs:
+            for path in (self.queue_dir / name).glob(self.run_id + "-*"):
+                path.unlink()
+
+    async def items(self) -> AsyncGenerator[Union[Summary, DeletedSummary], None]:
+        self.submit()
+        loop = asyncio.get_running_loop()
+        executor = None
+        local_workers = None
+        if self.workers:
+            executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+            local_workers = asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, work, self.queue_dir, self.run_id, self.use_uvloop)
+                    for _ in range(self.workers)
+                )
+            )
+        try:
+            await self.wait(local_workers)
+            # each shard is sorted already, merging streams them without loading the whole feed
+            for record in heapq.merge(*(self.read_shard(index) for index in range(self.shards)), key=record_key):
+                yield record
+        finally:
+            if executor is not None:
+                local_workers.cancel()
+                # retrieved, a worker error is already raised by wait or does not matter once it was cancelled
+                local_workers.add_done_callback(lambda future: future.cancelled() or future.exception())
+                executor.shutdown(wait=False, cancel_futures=True)
+            self.cleanup()
+
+    def report(self) -> dict:
+        return {"run": self.run_id, "shards": self.reports}
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="sync one feed in shards")
+    run_parser.add_argument("url")
+    run_parser.add_argument("version")
+    run_parser.add_argument("--workspace", type=Path, default=Path("/tmp/amazon3"))
+    run_parser.add_argument("--shards", type=int, default=os.cpu_count())
+    run_parser.add_argument("--queue-dir", type=Path, help="shared with the workers of other hosts")
+    run_parser.add_argument("--workers", type=int, help="local worker processes, shards by default")
+    run_parser.add_argument("--no-uvloop", action="store_true")
+
+    worker_parser = commands.add_parser("worker", help="run the shards queued in a shared directory")
+    worker_parser.add_argument("queue_dir", type=Path)
+    worker_parser.add_argument("--idle-timeout", type=float, default=60.0, help="exit after this long without tasks")
+    worker_parser.add_argument("--no-uvloop", action="store_true")
+
+    args = arg_parser.parse_args()
+    if args.command == "worker":
+        print(f"--ran {work(args.queue_dir, use_uvloop=not args.no_uvloop, idle_timeout=args.idle_timeout)} shards")
+    else:
+
+        async def main():
+            sync = ShardedSync(
+                args.workspace,
+                args.url,
+                args.version,
+                shards=args.shards,
+                queue_dir=args.queue_dir,
+                workers=args.workers,
+                use_uvloop=not args.no_uvloop,
+            )
+            count = 0
+            async for _ in sync.items():
+                count += 1
+            return count
+
+        start_time = time.perf_counter()
+        summary_count = asyncio.run(main())
+        print("--- %s seconds ---" % (time.perf_counter() - start_time))
+        print(f"--processed {summary_count} summaries.")
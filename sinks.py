@@ -0,0 +1,201 @@
+import abc
+import asyncio
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import List, Optional
+
+import aiofiles
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for compression="zstd"
+    zstandard = None
+
+"""
+Streaming output for the normalized vulnerability records (PVulnerability) leaving a driver. Records are buffered
+and written in batches, so memory stays flat whatever the size of the feed.
+"""
+
+
+class Sink(abc.ABC):
+    @abc.abstractmethod
+    async def write(self, record):
+        pass
+
+    async def flush(self):
+        pass
+
+    async def close(self):
+        await self.flush()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class NdjsonSink(Sink):
+    """
+    One json record per line, optionally gzip or zstd compressed. Lines are buffered until buffer_size bytes are
+    waiting or flush_interval seconds passed since the last flush; compression runs in a worker thread and the file
+    is written with aiofiles, so writing never blocks the event loop. Concurrent writers (e.g. several extracts
+    sharing the sink) are serialized by a lock, so batches reach the compressor and the file in order.
+
+    flush() (also run every flush_interval) ends the compressed data written so far on a block boundary (zlib
+    Z_SYNC_FLUSH, zstd FLUSH_BLOCK), so a reader of the file sees every record flushed before close.
+    """
+
+    compressions = (None, "gzip", "zstd")
+
+    def __init__(
+        self,
+        path: Path,
+        compression: Optional[str] = None,
+        buffer_size: int = 1 << 16,
+        flush_interval: float = 1.0,
+    ):
+        if compression not in self.compressions:
+            raise ValueError("Invalid compression: {}".format(compression))
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        self.path = path
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._flushed_at = time.monotonic()
+        self._fp = None
+        self._lock = asyncio.Lock()
+        # data given to the compressor since the last flush, still held back in its state
+        self._pending = False
+        if compression == "gzip":
+            # wbits 31: gzip container around the deflate stream
+            self._compressor = zlib.compressobj(wbits=31)
+        elif compression == "zstd":
+            self._compressor = zstandard.ZstdCompressor().compressobj()
+        else:
+            self._compressor = None
+
+    async def write(self, record):
+        line = record.json() + "\n"
+        self._buffer.append(line)
+        self._buffered += len(line)
+        self.count += 1
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            await self.flush()
+        elif self._buffered >= self.buffer_size:
+            await self._write("buffer")
+
+    def _encode(self, data: bytes, mode: str) -> bytes:
+        """mode: "buffer" to compress only, "sync" to also flush a readable block, "finish" to end the stream"""
+        if self._compressor is None:
+            return data
+        out = self._compressor.compress(data)
+        if mode == "sync":
+            flush_mode = zlib.Z_SYNC_FLUSH if self.compression == "gzip" else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            out += self._compressor.flush(flush_mode)
+        elif mode == "finish":
+            out += self._compressor.flush()
+        return out
+
+    async def _write(self, mode: str):
+        async with self._lock:
+            if not self._buffer and (mode == "buffer" or (mode == "sync" and not self._pending)):
+                return
+            data, self._buffer, self._buffered = "".join(self._buffer).encode(), [], 0
+            self._flushed_at = time.monotonic()
+            if self._fp is None:
+                self._fp = await aiofiles.open(self.path, "wb")
+            out = await asyncio.to_thread(self._encode, data, mode)
+            self._pending = self._compressor is not None and mode == "buffer"
+            if out:
+                await self._fp.write(out)
+                await self._fp.flush()
+
+    async def flush(self):
+        await self._write("sync")
+
+    async def close(self):
+        await self._write("finish")
+        await self._fp.close()
+
+
+class SqliteSink(Sink):
+    """
+    Records stored in sqlite, inserted batch_size at a time with executemany inside one transaction per batch.
+    The database work runs in a worker thread. Re-syncing a record replaces it.
+    """
+
+    schema = """
+    CREATE TABLE IF NOT EXISTS vulnerabilities (
+        name TEXT NOT NULL,
+        namespace TEXT NOT NULL,
+        severity TEXT,
+        link TEXT,
+        record TEXT NOT NULL,
+        PRIMARY KEY (name, namespace)
+    );
+    CREATE TABLE IF NOT EXISTS fixed_in (
+        vulnerability TEXT NOT NULL,
+        namespace TEXT NOT NULL,
+        name TEXT NOT NULL,
+        version_format TEXT,
+        version TEXT
+    );
+    CREATE INDEX IF NOT EXISTS fixed_in_name ON fixed_in (name);
+    CREATE INDEX IF NOT EXISTS fixed_in_vulnerability ON fixed_in (vulnerability, namespace);
+    """
+
+    def __init__(self, path: Path, batch_size: int = 500):
+        self.path = path
+        self.batch_size = batch_size
+        self.count = 0
+        self._batch = []
+        self._conn = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.executescript(self.schema)
+        return conn
+
+    def _insert(self, batch):
+        keys = [(record.Name, record.NamespaceName) for record in batch]
+        fixes = [
+            (record.Name, record.NamespaceName, fix.Name, fix.VersionFormat, fix.Version)
+            for record in batch
+            for fix in record.FixedIn
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM fixed_in WHERE vulnerability = ? AND namespace = ?", keys
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vulnerabilities VALUES (?, ?, ?, ?, ?)",
+                [
+                    (record.Name, record.NamespaceName, record.Severity, record.Link, record.json())
+                    for record in batch
+                ],
+            )
+            self._conn.executemany("INSERT INTO fixed_in VALUES (?, ?, ?, ?, ?)", fixes)
+
+    async def write(self, record):
+        self._batch.append(record)
+        self.count += 1
+        if len(self._batch) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if self._conn is None:
+            self._conn = await asyncio.to_thread(self._connect)
+        batch, self._batch = self._batch, []
+        if batch:
+            await asyncio.to_thread(self._insert, batch)
+
+    async def close(self):
+        await self.flush()
+        await asyncio.to_thread(self._conn.close)
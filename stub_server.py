@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+"""
+Local stand-in for alas.aws.amazon.com used by the benchmarks
+"""
+
+rss_template = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0">
+<channel>
+<title>Amazon Linux 2 Security Center</title>
+<link>{base_url}/alas2.html</link>
+<description>Amazon Linux 2 Security Bulletins</description>
+{items}
+</channel>
+</rss>
+"""
+
+item_template = """<item>
+<title>{alas_id} ({sev}): {pkg}</title>
+<description>{cves}</description>
+<pubDate>{pub_date}</pubDate>
+<lastBuildDate>{pub_date}</lastBuildDate>
+<link>{base_url}{prefix}/{alas_id}.html</link>
+</item>"""
+
+page_template = """<!DOCTYPE html>
+<html>
+<head><title>{alas_id}</title></head>
+<body>
+<div id="severity"><b>Severity:</b> {sev}</div>
+<div id="issue_overview"><p>Issue Overview:</p><p>{cves}</p></div>
+<div id="new_packages"><b>New Packages:</b><pre>{packages}</pre></div>
+{padding}
+</body>
+</html>
+"""
+
+severities = ["low", "medium", "important", "critical"]
+arches = ["aarch64", "i686", "noarch", "src", "x86_64"]
+
+
+def advisory_page(
+    alas_id: str, sev: str, pkg: str, version: str, cves: str, padding: int = 0
+) -> str:
+    packages = "".join(
+        "{arch}:<br />{rpms}".format(
+            arch=arch,
+            rpms="".join(
+                f"&nbsp;&nbsp;&nbsp; {name}-{version}.{arch}<br />"
+                for name in (pkg, f"{pkg}-devel")
+            ),
+        )
+        for arch in arches
+    )
+    # padding: number of filler paragraphs, to make pages as heavy to parse as real ones
+    filler = "".join(
+        f"<div class=\"filler\"><p>{alas_id} paragraph {n}</p></div>" for n in range(padding)
+    )
+    return page_template.format(
+        alas_id=alas_id, sev=sev, cves=cves, packages=packages, padding=filler
+    )
+
+
+def build_feed(count: int, base_url: str, padding: int = 0, release: str = "2") -> Dict[str, bytes]:
+    """
+    generate an ALAS style rss feed of count advisories plus one html page per advisory
+    :param release: Amazon Linux release, served at the same paths as alas.aws.amazon.com: /alas.rss for "1",
+    /AL<release>/alas.rss otherwise
+    :returns: a dict of request path -> response body, ready to be served by StubServer
+    """
+    prefix = "" if release == "1" else f"/AL{release}"
+    id_prefix = "ALAS" if release == "1" else f"ALAS{release}"
+    routes = {}
+    items = []
+    for i in range(1, count + 1):
+        alas_id = f"{id_prefix}-2021-{i:04}"
+        sev = severities[i % len(severities)]
+        pkg = f"package{i % 97}"
+        version = f"1.{i % 13}.{i}-{i % 5 + 1}.amzn{release}"
+        cves = ", ".join(f"CVE-2021-{i * 10 + n:05}" for n in range(i % 3 + 1))
+        pub_date = time.strftime(
+            "%a, %d %b %Y %H:%M:%S GMT", time.gmtime(1609459200 + i * 3600)
+        )
+        items.append(
+            item_template.format(
+                alas_id=alas_id,
+                sev=sev,
+                pkg=pkg,
+                cves=cves,
+                pub_date=pub_date,
+                base_url=base_url,
+                prefix=prefix,
+            )
+        )
+        routes[f"{prefix}/{alas_id}.html"] = advisory_page(
+            alas_id, sev, pkg, version, cves, padding
+        ).encode()
+    routes[f"{prefix}/alas.rss"] = rss_template.format(
+        base_url=base_url, items="\n".join(items)
+    ).encode()
+    return routes
+
+
+def load_recording(store_root: Path, base_url: str, origin: str = "https://alas.aws.amazon.com") -> Dict[str, bytes]:
+    """
+    routes replaying a run recorded in a blobstore.BlobStore, with the links to origin rewritten to base_url so the
+    recorded feed points at the stub server
+    """
+    from blobstore import BlobStore
+
+    async def read():
+        async with BlobStore(store_root) as store:
+            return {url: await store.get_name(url) for url in store.names}
+
+    return {
+        urlsplit(url).path: body.replace(origin.encode(), base_url.encode())
+        for url, body in asyncio.run(read()).items()
+    }
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    # the default listen backlog of 5 drops connections (1s SYN retransmits) as soon as a driver opens 20 at once
+    request_queue_size = 256
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # keep-alive, so pooled and per-call clients can be told apart
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.stub.connection_count += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_empty(self, status: int, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        stub = self.server.stub
+        path = self.path.split("?", 1)[0]
+        stub.request_count += 1
+        stub.request_times.setdefault(path, time.time())
+        delay = stub.latency + (stub.rng.uniform(0, stub.jitter) if stub.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        body = stub.routes.get(path)
+        if body is None:
+            self.send_empty(404)
+            return
+        # the feed fails separately, see feed_error_rate
+        error_rate = stub.feed_error_rate if path.endswith(".rss") else stub.error_rate
+        if error_rate and stub.rng.random() < error_rate:
+            stub.error_count += 1
+            if path.endswith(".rss") and stub.rng.random() < 0.5:
+                # a stream broken half way: the full length is announced, the connection closes before it was sent
+                self.send_response(200)
+                self.send_header("Content-Type", "text/xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body[: len(body) // 2])
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            self.send_empty(stub.error_status, {"Retry-After": stub.retry_after} if stub.retry_after else None)
+            return
+
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml" if self.path.endswith(".rss") else "text/html")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubServer:
+    """
+    Threaded http server serving a fixed set of routes on localhost, usable as a context manager:
+
+    with StubServer(latency=0.05) as server:
+        server.routes.update(build_feed(100, server.url))
+
+    - latency: seconds added to every response, plus a uniform random 0..jitter
+    - error_rate: share of advisory page requests answered with error_status instead of the page, with a
+      Retry-After header when retry_after is set
+    - feed_error_rate: share of feed (.rss) requests that fail, half of them like the pages and the other half
+      with the connection closed after the first half of the feed was sent
+    - request_times: wall clock time of the first request of every path
+    """
+
+    def __init__(
+        self,
+        routes: Optional[Dict[str, bytes]] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        retry_after: Optional[str] = None,
+        feed_error_rate: float = 0.0,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        seed: int = 42,
+    ):
+        self.routes = routes if routes is not None else {}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.feed_error_rate = feed_error_rate
+        self.rng = random.Random(seed)
+        self.request_count = 0
+        self.connection_count = 0
+        self.error_count = 0
+        self.request_times: Dict[str, float] = {}
+        self._httpd = StubHTTPServer(address, StubHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,65 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+import aiofiles
+
+"""
+Persisted state of the last feed sync, used to only process advisories that are new or changed since then
+"""
+
+
+def item_digest(item: dict) -> str:
+    """stable hash of the content of an rss item"""
+    return hashlib.sha1(json.dumps(item, sort_keys=True).encode()).hexdigest()
+
+
+class SyncState:
+    """
+    Maps ALAS id -> {"hash": content hash of the rss item, "pub_date": pubDate, "version": feed version}
+
+    An advisory is only re-processed when its rss item hash changed. Entries are only updated after an advisory
+    was processed successfully, so failed advisories are retried by the next run.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        self._loaded = False
+
+    async def load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path.exists():
+            async with aiofiles.open(self.path, "r") as fp:
+                self.entries = json.loads(await fp.read())
+
+    async def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        async with aiofiles.open(tmp_path, "w") as fp:
+            await fp.write(json.dumps(self.entries, sort_keys=True))
+        # replace in one step so an interrupted save never leaves a truncated state
+        tmp_path.replace(self.path)
+
+    def is_changed(self, alas_id: str, digest: str) -> bool:
+        entry = self.entries.get(alas_id)
+        return entry is None or entry["hash"] != digest
+
+    def update(self, alas_id: str, digest: str, pub_date: Optional[str], version):
+        self.entries[alas_id] = {"hash": digest, "pub_date": pub_date, "version": version}
+
+    def deleted(self, version, seen_ids: Iterable[str]) -> Set[str]:
+        """ids of the given feed version recorded by a previous sync that are no longer in the feed"""
+        seen_ids = set(seen_ids)
+        return {
+            alas_id
+            for alas_id, entry in self.entries.items()
+            if entry["version"] == version and alas_id not in seen_ids
+        }
+
+    def remove(self, alas_ids: Iterable[str]):
+        for alas_id in alas_ids:
+            self.entries.pop(alas_id, None)
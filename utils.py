@@ -1,18 +1,46 @@
 from html.parser import HTMLParser
+from typing import AsyncGenerator
 
 import aiofiles
 import httpx
 
 
-async def download_remote_file(url, output_path, timeout: int = 125) -> str:
-    """asynchronously downloads and stores a remote file"""
+async def download_remote_file(url, output_path, timeout: int = 125, client=None, cache=None) -> str:
+    """
+    asynchronously downloads and stores a remote file
+    pass a long lived client (see client.PooledClient) to reuse its connection pool, otherwise a new client is
+    created for this single download
+    pass a cache.HttpCache to revalidate or reuse a previous download of output_path instead of fetching it again
+    output_path None only downloads
+    """
     # skip_if_exists moved out to a calling method because standard logger is blocking
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, timeout=timeout, follow_redirects=True)
-        resp.raise_for_status()  # will raise any 4xx or 5xx  response codes as exceptions
+    if client is None:
+        async with httpx.AsyncClient() as client:
+            return await download_remote_file(url, output_path, timeout, client, cache)
+
+    if cache is not None:
+        return await cache.download(url, output_path, client, timeout)
+
+    resp = await client.get(url, timeout=timeout, follow_redirects=True)
+    resp.raise_for_status()  # will raise any 4xx or 5xx  response codes as exceptions
+    if output_path is not None:
         async with aiofiles.open(output_path, "w") as fp:
             await fp.write(resp.text)
-        return resp.text
+    return resp.text
+
+
+async def stream_remote_file(url, output_path, client, timeout: int = 125) -> AsyncGenerator[bytes, None]:
+    """asynchronously downloads and stores a remote file, yielding the raw body chunks as they arrive"""
+    async with client.stream(url, timeout=timeout, follow_redirects=True) as resp:
+        resp.raise_for_status()  # will raise any 4xx or 5xx  response codes as exceptions
+        if output_path is None:
+            async for chunk in resp.aiter_bytes():
+                yield chunk
+            return
+        async with aiofiles.open(output_path, "wb") as fp:
+            async for chunk in resp.aiter_bytes():
+                await fp.write(chunk)
+                yield chunk
 
 
 def split_rpm_filename(rpm_filename):
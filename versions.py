@@ -0,0 +1,88 @@
+import math
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+"""
+rpm version comparison (rpmvercmp) and precomputed sort keys, so fixes can be matched against an installed package
+inventory with a sort or a binary search instead of pairwise comparisons
+"""
+
+# rpm only considers ascii alphanumerics, tilde and caret, anything else separates segments
+segment_pattern = re.compile(r"[0-9]+|[a-zA-Z]+|~|\^")
+
+# segment ranks, ordered the way rpmvercmp orders them against each other
+TILDE = (-1,)
+END = (0,)
+CARET = (1,)
+ALPHA = 2
+NUMERIC = 3
+
+# FixedIn.Version of a package that is vulnerable with no fix available yet
+NO_FIX = "None"
+NO_FIX_KEY = (math.inf,)
+
+
+@lru_cache(maxsize=1 << 16)
+def version_key(version: str) -> tuple:
+    """
+    Sort key of a version or release string: for any a, b
+    cmp(version_key(a), version_key(b)) == rpmvercmp(a, b)
+
+    Each segment becomes a (rank, value) pair and the key ends with END, so that tilde sorts before the end of the
+    string and caret after it but before any further segment.
+    """
+    key = []
+    for segment in segment_pattern.findall(version):
+        if segment == "~":
+            key.append(TILDE)
+        elif segment == "^":
+            key.append(CARET)
+        elif segment[0].isdigit():
+            key.append((NUMERIC, int(segment)))
+        else:
+            key.append((ALPHA, segment))
+    key.append(END)
+    return tuple(key)
+
+
+def rpmvercmp(a: str, b: str) -> int:
+    """compare two version (or release) strings like rpm does: 1 if a is newer, -1 if b is newer, 0 if equal"""
+    if a == b:
+        return 0
+    key_a, key_b = version_key(a), version_key(b)
+    return (key_a > key_b) - (key_a < key_b)
+
+
+def split_evr(evr: str) -> Tuple[int, str, Optional[str]]:
+    """[epoch:]version[-release] -> (epoch, version, release), the epoch defaults to 0"""
+    epoch, colon, version_release = evr.partition(":")
+    if not colon:
+        epoch, version_release = "0", evr
+    version, dash, release = version_release.rpartition("-")
+    if not dash:
+        version, release = release, None
+    return int(epoch or 0), version, release
+
+
+@lru_cache(maxsize=1 << 16)
+def evr_key(evr: str) -> tuple:
+    """
+    Sort key of an [epoch:]version[-release] string such as FixedIn.Version. A missing release sorts before any
+    release of the same version. "None" (no fix available) sorts after every version.
+    """
+    if evr == NO_FIX:
+        return NO_FIX_KEY
+    epoch, version, release = split_evr(evr)
+    return epoch, version_key(version), version_key(release) if release is not None else ()
+
+
+def label_compare(evr_a: str, evr_b: str) -> int:
+    """compare two [epoch:]version[-release] strings: 1 if evr_a is newer, -1 if evr_b is newer, 0 if equal"""
+    key_a, key_b = evr_key(evr_a), evr_key(evr_b)
+    return (key_a > key_b) - (key_a < key_b)
+
+
+def is_vulnerable(installed_evr: str, fixed_evr: str) -> bool:
+    """all the versions older than the fixed one are vulnerable"""
+    return evr_key(installed_evr) < evr_key(fixed_evr)